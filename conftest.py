@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def synchronous_thumbnails(settings):
+    """Миниатюры строятся сразу, без фонового пула потоков.
+
+    Иначе в транзакционных тестах поток пишет миниатюру в MEDIA_ROOT,
+    который фикстура mock_media уже удаляет.
+    """
+    settings.THUMBNAIL_WORKERS = 0
@@ -0,0 +1,36 @@
+import pytest
+from django.core.cache import cache
+
+from core.testing import QueryBudget
+from posts.models import Comment, Follow, Group, Post
+
+
+@pytest.fixture
+def query_budget():
+    """Фабрика QueryBudget: ``with query_budget(8, max_time=0.5): ...``."""
+    cache.clear()
+    return QueryBudget
+
+
+@pytest.fixture
+def populated_site(mixer, user, another_user):
+    """Объем данных, при котором N+1 заметен: посты, комментарии, подписки."""
+    groups = mixer.cycle(3).blend(Group)
+    authors = [another_user] + mixer.cycle(5).blend('auth.User')
+    for author in authors:
+        mixer.blend(Follow, user=user, author=author)
+    posts = [
+        mixer.blend(
+            Post,
+            author=authors[number % len(authors)],
+            group=groups[number % len(groups)],
+            image='',
+        )
+        for number in range(60)
+    ]
+    readers = mixer.cycle(10).blend('auth.User')
+    for number in range(30):
+        mixer.blend(
+            Comment, post=posts[0], author=readers[number % len(readers)]
+        )
+    return {'groups': groups, 'authors': authors, 'posts': posts}
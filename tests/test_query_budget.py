@@ -0,0 +1,50 @@
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+MAX_SQL_TIME = 0.5
+
+
+class TestQueryBudget:
+
+    def check_budget(self, client, query_budget, url, max_queries):
+        with query_budget(max_queries, max_time=MAX_SQL_TIME):
+            response = client.get(url)
+        assert response.status_code == 200, f'Страница `{url}` не открылась'
+
+    def test_index_budget(self, client, query_budget, populated_site):
+        self.check_budget(client, query_budget, '/', 2)
+
+    def test_index_deep_page_budget(self, client, query_budget, populated_site):
+        self.check_budget(client, query_budget, '/?page=5', 2)
+
+    def test_group_budget(self, client, query_budget, populated_site):
+        group = populated_site['groups'][0]
+        self.check_budget(client, query_budget, f'/group/{group.slug}/', 2)
+
+    def test_profile_budget(self, client, query_budget, populated_site):
+        author = populated_site['authors'][0]
+        self.check_budget(
+            client, query_budget, f'/profile/{author.username}/', 2
+        )
+
+    def test_post_detail_budget(self, client, query_budget, populated_site):
+        post = populated_site['posts'][0]
+        self.check_budget(client, query_budget, f'/posts/{post.pk}/', 2)
+
+    def test_follow_index_budget(self, user_client, query_budget, populated_site):
+        self.check_budget(user_client, query_budget, '/follow/', 4)
+
+    def test_follow_index_cursor_budget(self, user_client, query_budget, populated_site):
+        response = user_client.get('/follow/?cursor=')
+        cursor = response.context['page_obj'].next_cursor
+        self.check_budget(
+            user_client, query_budget, f'/follow/?cursor={cursor}', 3
+        )
+
+    def test_budget_reports_queries(self, query_budget, populated_site):
+        from posts.models import Post
+        with pytest.raises(AssertionError, match='бюджете 1'):
+            with query_budget(1):
+                for post in Post.objects.all()[:3]:
+                    post.author.username
@@ -0,0 +1,59 @@
+"""PostgreSQL с пулом соединений внутри процесса.
+
+Соединения берутся из psycopg2.pool.ThreadedConnectionPool, общего для
+всех потоков процесса, и возвращаются в него вместо закрытия. Размер
+пула задается ключом POOL в настройках БД:
+``'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 20}``. MAX_SIZE должен быть не
+меньше числа потоков воркера. С пулом обычно ставят CONN_MAX_AGE = 0:
+соединение возвращается в пул в конце каждого запроса.
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from psycopg2 import pool
+except ImportError as error:
+    raise ImproperlyConfigured(
+        'Для core.backends.postgresql_pool нужен пакет psycopg2: '
+        'pip install -r requirements-postgresql.txt'
+    ) from error
+
+from django.db.backends.postgresql import base
+
+_pools = {}
+_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_pool(self, conn_params):
+        with _lock:
+            if self.alias not in _pools:
+                options = self.settings_dict.get('POOL', {})
+                _pools[self.alias] = pool.ThreadedConnectionPool(
+                    options.get('MIN_SIZE', 1),
+                    options.get('MAX_SIZE', 10),
+                    **conn_params
+                )
+            return _pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool(conn_params).getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            _pools[self.alias].putconn(
+                self.connection,
+                close=bool(self.connection.closed) or self.errors_occurred,
+            )
@@ -0,0 +1,180 @@
+"""Двухуровневый кеш: L1 в памяти процесса перед общим L2.
+
+L1 (обычно LocMemCache) живет не дольше LOCAL_TIMEOUT секунд. Запись
+и удаление по ключу сразу попадают в L2 и в L1 своего воркера, но
+остальные воркеры еще до LOCAL_TIMEOUT секунд читают прежнее значение
+из своего L1: версии отдельных ключей не ведутся, иначе каждое чтение
+шло бы в L2. Все ключи включают поколение, которое хранится в L2:
+clear() увеличивает его, и старые записи перестают читаться во всех
+воркерах (тоже не позже LOCAL_TIMEOUT) без очистки общего хранилища.
+
+Ключи, которым нужна согласованность между воркерами, обходят L1:
+отметки времени изменения читаются и пишутся напрямую через shared,
+блокировки и записи stale_cache — через coherent, который тоже идет
+мимо L1, но сохраняет поколение, поэтому их сбрасывает clear().
+"""
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .metrics import record_cache
+
+GENERATION_KEY = 'two_tier_generation'
+MISSING = object()
+
+_generations = {}
+
+
+class CoherentTier:
+    """Ключи TwoTierCache в L2 без копий в L1: все воркеры видят одно."""
+
+    def __init__(self, tiers):
+        self._tiers = tiers
+
+    def get(self, key, default=None):
+        value = self._tiers.shared.get(self._tiers._key(key), MISSING)
+        if value is MISSING:
+            record_cache(0, 1)
+            return default
+        record_cache(1, 0)
+        return value
+
+    def add(self, key, value, timeout):
+        return self._tiers.shared.add(self._tiers._key(key), value, timeout)
+
+    def set(self, key, value, timeout):
+        self._tiers.shared.set(self._tiers._key(key), value, timeout)
+
+    def delete(self, key):
+        self._tiers.shared.delete(self._tiers._key(key))
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._local_alias = options.get('LOCAL', 'local')
+        self._shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+
+    @property
+    def local(self):
+        return caches[self._local_alias]
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    @property
+    def coherent(self):
+        return CoherentTier(self)
+
+    def generation(self):
+        """Текущее поколение ключей, общее для всех экземпляров процесса."""
+        now = time.monotonic()
+        generation, checked = _generations.get(self._shared_alias, (None, 0))
+        if generation is None or now - checked > self.local_timeout:
+            generation = self.shared.get(GENERATION_KEY)
+            if generation is None:
+                self.shared.add(GENERATION_KEY, int(time.time()), None)
+                generation = self.shared.get(GENERATION_KEY)
+            _generations[self._shared_alias] = (generation, now)
+        return generation
+
+    def _key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return f'{self.generation()}:{key}'
+
+    def _timeouts(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None, self.local_timeout
+        return timeout, min(timeout, self.local_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        shared_timeout, local_timeout = self._timeouts(timeout)
+        added = self.shared.add(key, value, shared_timeout)
+        if added:
+            self.local.set(key, value, local_timeout)
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        value = self.local.get(key, MISSING)
+        if value is MISSING:
+            value = self.shared.get(key, MISSING)
+            if value is MISSING:
+                record_cache(0, 1)
+                return default
+            self.local.set(key, value, self.local_timeout)
+        record_cache(1, 0)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        shared_timeout, local_timeout = self._timeouts(timeout)
+        self.shared.set(key, value, shared_timeout)
+        self.local.set(key, value, local_timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self.local.delete(key)
+        return self.shared.touch(key, self._timeouts(timeout)[0])
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            fetched = self.shared.get_many(missing)
+            if fetched:
+                self.local.set_many(fetched, self.local_timeout)
+            found.update(fetched)
+        record_cache(len(found), len(keys) - len(found))
+        return {keys[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        data = {self._key(key, version): value for key, value in data.items()}
+        shared_timeout, local_timeout = self._timeouts(timeout)
+        failed = self.shared.set_many(data, shared_timeout) or []
+        self.local.set_many(data, local_timeout)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        self.local.delete_many(keys)
+        self.shared.delete_many(keys)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        self.local.delete(key)
+        return self.shared.incr(key, delta)
+
+    def clear(self):
+        """Переводит все воркеры на новое поколение ключей."""
+        self.generation()
+        try:
+            generation = self.shared.incr(GENERATION_KEY)
+        except ValueError:
+            self.shared.add(GENERATION_KEY, int(time.time()), None)
+            generation = self.shared.get(GENERATION_KEY)
+        _generations[self._shared_alias] = (generation, time.monotonic())
+        self.local.clear()
+
+    def close(self, **kwargs):
+        # Уровни — обычные алиасы CACHES, и request_finished закрывает их
+        # сам. Обращение к caches[...] здесь создало бы экземпляр во время
+        # обхода caches.all().
+        pass
@@ -0,0 +1,91 @@
+"""Чтение из реплик БД для приложения posts.
+
+Представления, помеченные replica_reads, читают модели posts из
+случайной реплики из DATABASE_REPLICAS. Реплика выбирается один раз на
+запрос: счетчик, список и связанные объекты страницы читаются из одной
+реплики с одним отставанием. Представления с записью
+помечаются pin_primary: ответ ставит cookie, и пока она жива
+(REPLICA_PIN_SECONDS), запросы пользователя читают из основной БД —
+так он сразу видит свои изменения, даже если реплика отстает.
+Пользователи и сессии всегда читаются из основной БД.
+"""
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+PIN_COOKIE = 'db_primary_pin'
+ROUTED_APPS = ('posts',)
+
+_state = threading.local()
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def is_pinned(request):
+    return PIN_COOKIE in request.COOKIES
+
+
+@contextmanager
+def reading_from_replica(enabled=True):
+    """Чтение внутри блока идет из одной реплики; вложенный блок
+    продолжает читать из реплики внешнего."""
+    previous = getattr(_state, 'replica', None)
+    aliases = replica_aliases()
+    if not enabled or not aliases:
+        _state.replica = None
+    elif previous not in aliases:
+        _state.replica = random.choice(aliases)
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def replica_reads(view):
+    """Читает модели posts из реплики, если пользователь не закреплен."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with reading_from_replica(not is_pinned(request)):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def pin_primary(view):
+    """Закрепляет пользователя за основной БД после запроса на запись."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method == 'POST' or response.status_code in (301, 302):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+            )
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """Запись — всегда в default, чтение posts — из реплики по флагу."""
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(_state, 'replica', None)
+        if alias and model._meta.app_label in ROUTED_APPS:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,189 @@
+"""Метрики запросов: время, SQL, шаблоны, кеш и размер ответа.
+
+Middleware заводит RequestStats на время запроса (в thread-local),
+SQL считается через execute_wrapper, шаблоны — обертка над
+Template._render, кеш — TwoTierCache. Итоги по представлениям
+накапливаются в памяти процесса и отдаются в формате Prometheus;
+у каждого воркера свой реестр, поэтому метрики помечены pid.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.template.base import Template
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+MAX_LOGGED_QUERIES = 50
+COUNTERS = (
+    'db_queries_total',
+    'db_duration_seconds_total',
+    'template_duration_seconds_total',
+    'cache_hits_total',
+    'cache_misses_total',
+    'response_bytes_total',
+)
+
+_state = threading.local()
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.queries = []
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join((
+            f'total;dur={self.duration * 1000:.1f}',
+            f'db;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="hits={self.cache_hits} '
+            f'misses={self.cache_misses}"',
+        ))
+
+
+def current():
+    """Статистика текущего запроса или None вне запроса."""
+    return getattr(_state, 'stats', None)
+
+
+def start():
+    _state.stats = RequestStats()
+    return _state.stats
+
+
+def stop():
+    _state.stats = None
+
+
+def record_cache(hits, misses):
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """execute_wrapper: время и текст запросов текущего запроса."""
+    stats = current()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.sql_count += 1
+        stats.sql_time += elapsed
+        if len(stats.queries) < MAX_LOGGED_QUERIES:
+            stats.queries.append((elapsed, sql))
+
+
+def _timed_render(self, context):
+    stats = current()
+    if stats is None:
+        return _original_render(self, context)
+    # Вложенные include считаются в составе внешнего шаблона.
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_time += time.perf_counter() - started
+
+
+_original_render = Template._render
+
+
+def instrument_templates():
+    """Подменяет Template._render один раз за процесс."""
+    if Template._render is not _timed_render:
+        Template._render = _timed_render
+
+
+class Registry:
+    """Накопленные метрики по представлениям."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = defaultdict(int)
+        self.buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self.totals = defaultdict(lambda: defaultdict(float))
+
+    def observe(self, view, method, status, stats, size):
+        with self.lock:
+            self.requests[view, method, status] += 1
+            buckets = self.buckets[view]
+            for number, bound in enumerate(DURATION_BUCKETS):
+                if stats.duration <= bound:
+                    buckets[number] += 1
+            totals = self.totals[view]
+            totals['request_duration_seconds_sum'] += stats.duration
+            totals['request_duration_seconds_count'] += 1
+            totals['db_queries_total'] += stats.sql_count
+            totals['db_duration_seconds_total'] += stats.sql_time
+            totals['template_duration_seconds_total'] += stats.template_time
+            totals['cache_hits_total'] += stats.cache_hits
+            totals['cache_misses_total'] += stats.cache_misses
+            totals['response_bytes_total'] += size
+
+    def render(self):
+        """Текст в формате Prometheus exposition."""
+        pid = os.getpid()
+        lines = ['# TYPE yatube_requests_total counter']
+        with self.lock:
+            for (view, method, status), count in sorted(
+                self.requests.items()
+            ):
+                lines.append(
+                    f'yatube_requests_total{{pid="{pid}",view="{view}",'
+                    f'method="{method}",status="{status}"}} {count}'
+                )
+            views = sorted(self.buckets)
+            lines.append('# TYPE yatube_request_duration_seconds histogram')
+            for view in views:
+                labels = f'pid="{pid}",view="{view}"'
+                totals = self.totals[view]
+                bounds = [*DURATION_BUCKETS, '+Inf']
+                counts = [
+                    *self.buckets[view],
+                    totals['request_duration_seconds_count'],
+                ]
+                for bound, count in zip(bounds, counts):
+                    lines.append(
+                        'yatube_request_duration_seconds_bucket'
+                        f'{{{labels},le="{bound}"}} {count:g}'
+                    )
+                for name in ('sum', 'count'):
+                    value = totals[f'request_duration_seconds_{name}']
+                    lines.append(
+                        f'yatube_request_duration_seconds_{name}'
+                        f'{{{labels}}} {value:g}'
+                    )
+            for name in COUNTERS:
+                lines.append(f'# TYPE yatube_{name} counter')
+                for view in views:
+                    lines.append(
+                        f'yatube_{name}{{pid="{pid}",view="{view}"}} '
+                        f'{self.totals[view][name]:g}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
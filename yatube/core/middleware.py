@@ -0,0 +1,80 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+slow_logger = logging.getLogger('yatube.slow_requests')
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+def response_size(response):
+    if response.streaming:
+        return int(response.get('Content-Length', 0))
+    return len(response.content)
+
+
+class PerformanceMiddleware:
+    """Метрики каждого запроса: Server-Timing, реестр и журнал медленных.
+
+    Ставится первым в MIDDLEWARE, чтобы учитывать остальные middleware.
+    Запросы дольше SLOW_REQUEST_SECONDS с вероятностью
+    SLOW_REQUEST_SAMPLE_RATE пишутся в журнал вместе с SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.instrument_templates()
+
+    def __call__(self, request):
+        stats = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.sql_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        stats.finish()
+        view = view_name(request)
+        size = response_size(response)
+        metrics.registry.observe(
+            view, request.method, response.status_code, stats, size
+        )
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = stats.server_timing()
+        if (
+            stats.duration >= settings.SLOW_REQUEST_SECONDS
+            and random.random() < settings.SLOW_REQUEST_SAMPLE_RATE
+        ):
+            self.log_slow(request, response, view, stats, size)
+        return response
+
+    def log_slow(self, request, response, view, stats, size):
+        slow_logger.warning(json.dumps({
+            'path': request.get_full_path(),
+            'method': request.method,
+            'view': view,
+            'status': response.status_code,
+            'duration': round(stats.duration, 4),
+            'sql_time': round(stats.sql_time, 4),
+            'sql_count': stats.sql_count,
+            'template_time': round(stats.template_time, 4),
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+            'size': size,
+            'queries': [
+                {'time': round(elapsed, 4), 'sql': sql}
+                for elapsed, sql in stats.queries
+            ],
+        }, ensure_ascii=False))
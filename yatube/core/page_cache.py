@@ -0,0 +1,86 @@
+"""Общий для всех пользователей кеш страницы с «дырками».
+
+cache_page_shared кеширует HTML один раз на адрес, независимо от
+cookie. Личные части шаблона (шапка, переключатель лент) подключаются
+тегом {% hole %}: при сборке страницы для кеша вместо них выводится
+маркер, а перед отдачей каждый маркер заменяется отрисовкой маленького
+шаблона с контекстом текущего запроса. Пользовательский текст
+экранируется, поэтому подделать маркер из содержимого поста нельзя.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.template.loader import render_to_string
+from django.utils.cache import patch_response_headers
+
+from .stale_cache import get_or_compute
+
+HOLE_PATTERN = re.compile(r'<!--hole:([\w./-]+)-->')
+
+
+def hole_marker(template_name):
+    return f'<!--hole:{template_name}-->'
+
+
+def punching_holes(request):
+    """Страница собирается для общего кеша: личные части — маркерами."""
+    return getattr(request, '_punch_holes', False)
+
+
+def fill_holes(request, content):
+    rendered = {}
+
+    def render(match):
+        name = match.group(1)
+        if name not in rendered:
+            rendered[name] = render_to_string(name, request=request)
+        return rendered[name]
+    return HOLE_PATTERN.sub(render, content)
+
+
+def page_key(request, key_prefix):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'shared_page:{key_prefix}:{url}'
+
+
+def cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def cache_page_shared(timeout, key_prefix=''):
+    """Аналог cache_page: одна запись на адрес для всех пользователей.
+
+    Запись пересчитывается через stale_cache: после истечения срока ее
+    обновляет один запрос, остальные получают предыдущую версию.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            def render_page():
+                request._punch_holes = True
+                try:
+                    return view(request, *args, **kwargs)
+                finally:
+                    request._punch_holes = False
+
+            response = get_or_compute(
+                page_key(request, key_prefix), render_page, timeout,
+                cache_if=cacheable
+            )
+            if response.streaming:
+                return response
+            response.content = fill_holes(
+                request, response.content.decode(response.charset)
+            )
+            patch_response_headers(response, timeout)
+            return response
+        return wrapper
+    return decorator
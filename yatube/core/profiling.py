@@ -0,0 +1,229 @@
+"""Выборочное профилирование запросов в рабочих процессах.
+
+Включается персоналом через /profiling/: настройки (доля запросов,
+режим, представления, срок) лежат в общем кеше, поэтому их подхватывают
+все воркеры без перезапуска, а по истечении срока профилирование
+выключается само. Режимы:
+
+* ``cprofile`` — cProfile, результаты складываются в pstats.Stats;
+* ``sample`` — статистический сэмплер стеков с малыми накладными
+  расходами, результат в формате collapsed stacks (flamegraph.pl,
+  speedscope).
+
+Результаты копятся по имени представления и раз в PROFILE_DUMP_SECONDS
+записываются в PROFILE_DIR файлами ``<view>.<pid>.pstats`` или
+``<view>.<pid>.collapsed`` (``:`` в имени представления заменяется
+на ``-``).
+"""
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+
+CONFIG_KEY = 'profiling:config'
+MODES = ('cprofile', 'sample')
+SERVICE_VIEWS = ('metrics', 'profiling')
+
+
+def get_config():
+    return cache.get(CONFIG_KEY)
+
+
+def configure(rate, mode='cprofile', views=(), minutes=10):
+    """Профилировать rate процентов запросов к views (все, если пусто)."""
+    if rate <= 0:
+        cache.delete(CONFIG_KEY)
+        return None
+    config = {
+        'rate': min(rate, 100),
+        'mode': mode,
+        'views': sorted(views),
+        'until': time.time() + minutes * 60,
+    }
+    cache.set(CONFIG_KEY, config, minutes * 60)
+    return config
+
+
+class Sampler(threading.Thread):
+    """Снимает стеки потоков, зарегистрированных в sampler.threads."""
+
+    def __init__(self, interval):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.interval = interval
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    def watch(self, thread_id):
+        stacks = Counter()
+        with self.lock:
+            self.threads[thread_id] = stacks
+        return stacks
+
+    def unwatch(self, thread_id):
+        with self.lock:
+            self.threads.pop(thread_id, None)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.threads:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self.threads.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f'{code.co_name} ({os.path.basename(code.co_filename)}'
+            f':{code.co_firstlineno})'
+        )
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def dump_name(view, pid, extension):
+    return '{}.{}.{}'.format(view.replace(':', '-'), pid, extension)
+
+
+class Results:
+    """Накопленные профили процесса по представлениям."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.stacks = defaultdict(Counter)
+        self.requests = Counter()
+        self.dumped = time.monotonic()
+
+    def add_profile(self, view, profiler):
+        with self.lock:
+            if view in self.stats:
+                self.stats[view].add(profiler)
+            else:
+                self.stats[view] = pstats.Stats(profiler)
+            self.requests[view] += 1
+
+    def add_stacks(self, view, stacks):
+        with self.lock:
+            self.stacks[view].update(stacks)
+            self.requests[view] += 1
+
+    def dump_if_due(self):
+        if time.monotonic() - self.dumped >= settings.PROFILE_DUMP_SECONDS:
+            self.dump()
+
+    def dump(self):
+        """Пишет профили в PROFILE_DIR, возвращает список файлов."""
+        directory = settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        pid = os.getpid()
+        written = []
+        with self.lock:
+            self.dumped = time.monotonic()
+            for view, stats in self.stats.items():
+                path = os.path.join(
+                    directory, dump_name(view, pid, 'pstats')
+                )
+                stats.dump_stats(path)
+                written.append(path)
+            for view, stacks in self.stacks.items():
+                path = os.path.join(
+                    directory, dump_name(view, pid, 'collapsed')
+                )
+                with open(path, 'w', encoding='utf-8') as output:
+                    for stack, count in stacks.most_common():
+                        output.write(f'{stack} {count}\n')
+                written.append(path)
+        return written
+
+
+results = Results()
+_sampler = None
+_profiler_lock = threading.Lock()
+_sampler_lock = threading.Lock()
+
+
+def sampler():
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = Sampler(settings.PROFILE_SAMPLE_INTERVAL)
+            _sampler.start()
+    return _sampler
+
+
+def view_name(request):
+    try:
+        return resolve(request.path_info).view_name
+    except Resolver404:
+        return None
+
+
+def should_profile(request, config):
+    if config is None or random.random() * 100 >= config['rate']:
+        return None
+    view = view_name(request)
+    if view is None or view in SERVICE_VIEWS:
+        return None
+    if config['views'] and view not in config['views']:
+        return None
+    return view
+
+
+class ProfilingMiddleware:
+    """Профилирует долю запросов по настройкам из кеша."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+        view = should_profile(request, config)
+        if view is None:
+            return self.get_response(request)
+        if config['mode'] == 'sample':
+            response = self.sample(request, view)
+        else:
+            response = self.profile(request, view)
+        results.dump_if_due()
+        return response
+
+    def profile(self, request, view):
+        # Одновременно в процессе работает только один cProfile.
+        if not _profiler_lock.acquire(blocking=False):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            results.add_profile(view, profiler)
+        finally:
+            _profiler_lock.release()
+        return response
+
+    def sample(self, request, view):
+        thread_id = threading.get_ident()
+        stacks = sampler().watch(thread_id)
+        try:
+            return self.get_response(request)
+        finally:
+            sampler().unwatch(thread_id)
+            results.add_stacks(view, stacks)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению SQLite.
+
+    synchronous=NORMAL в WAL безопасен для целостности, busy_timeout
+    сглаживает блокировки. Здесь только настройки соединения: режим
+    журнала задает set_journal_mode.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(post_migrate)
+def set_journal_mode(sender, using, **kwargs):
+    """Переводит файл SQLite в SQLITE_JOURNAL_MODE после migrate.
+
+    WAL позволяет читать во время записи. Режим сохраняется в файле БД,
+    поэтому его достаточно задать один раз, а не в каждом соединении.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}')
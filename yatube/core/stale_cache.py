@@ -0,0 +1,89 @@
+"""Кеш без «стада»: один пересчет на ключ, остальные получают старое.
+
+Запись хранит значение, момент, до которого оно свежее, и время его
+вычисления. После срока свежести значение еще CACHE_STALE_TIME
+секунд отдается как устаревшее, пока один запрос, захвативший
+блокировку (cache.add), пересчитывает его. Пересчет может начаться и
+чуть раньше срока: вероятность растет по мере приближения к нему и
+тем выше, чем дольше вычисление (XFetch), поэтому запросы не
+упираются в истечение ключа одновременно. Если значения нет совсем,
+остальные запросы ждут пересчета не дольше CACHE_LOCK_TIMEOUT.
+
+Запись и блокировка читаются мимо L1 воркера (TwoTierCache.coherent),
+поэтому пересчет один на ключ, а не на воркер. В блокировке лежит
+токен владельца: снимается только своя блокировка, а не взятая другим
+запросом после того, как наша истекла.
+"""
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+POLL_INTERVAL = 0.05
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def storage():
+    """Кеш без копий в памяти воркера, если он двухуровневый."""
+    return getattr(cache, 'coherent', cache)
+
+
+def release(lock, token):
+    """Снимает блокировку, только если она все еще наша."""
+    locks = storage()
+    if locks.get(lock) == token:
+        locks.delete(lock)
+
+
+def expired(fresh_until, delta, now):
+    """Истекло ли значение с учетом вероятностного раннего пересчета."""
+    early = delta * settings.CACHE_EARLY_BETA * -math.log(
+        1 - random.random()
+    )
+    return now + early >= fresh_until
+
+
+def compute_and_store(key, compute, timeout, cache_if):
+    started = time.time()
+    value = compute()
+    delta = time.time() - started
+    if cache_if is None or cache_if(value):
+        storage().set(
+            key, (value, started + delta + timeout, delta),
+            timeout + settings.CACHE_STALE_TIME
+        )
+    return value
+
+
+def get_or_compute(key, compute, timeout, cache_if=None):
+    """Значение key из кеша или compute(); cache_if решает, кешировать ли."""
+    entries = storage()
+    entry = entries.get(key)
+    if entry is not None:
+        value, fresh_until, delta = entry
+        if not expired(fresh_until, delta, time.time()):
+            return value
+    lock = lock_key(key)
+    token = uuid.uuid4().hex
+    if entries.add(lock, token, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            return compute_and_store(key, compute, timeout, cache_if)
+        finally:
+            release(lock, token)
+    if entry is not None:
+        return entry[0]
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = entries.get(key)
+        if entry is not None:
+            return entry[0]
+        if entries.get(lock) is None:
+            break
+    return compute_and_store(key, compute, timeout, cache_if)
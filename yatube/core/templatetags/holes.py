@@ -0,0 +1,20 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.page_cache import hole_marker, punching_holes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name):
+    """Личная часть страницы: {% hole 'includes/header.html' %}.
+
+    Вне cache_page_shared работает как include.
+    """
+    request = context.get('request')
+    if request is not None and punching_holes(request):
+        return mark_safe(hole_marker(template_name))
+    included = context.template.engine.get_template(template_name)
+    with context.push():
+        return included.render(context)
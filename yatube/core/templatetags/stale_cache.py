@@ -0,0 +1,51 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.stale_cache import get_or_compute
+
+register = template.Library()
+
+
+class StaleCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        try:
+            timeout = int(timeout)
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f'stale_cache: неверный срок "{timeout}"'
+            )
+        key = 'stale:' + make_template_fragment_key(
+            self.fragment_name,
+            [variable.resolve(context) for variable in self.vary_on],
+        )
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context), timeout
+        )
+
+
+@register.tag
+def stale_cache(parser, token):
+    """Замена {% cache %} с защитой от одновременного пересчета.
+
+    {% stale_cache 20 fragment_name var1 var2 %}...{% endstale_cache %}
+    """
+    nodelist = parser.parse(('endstale_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]} требует срок и имя фрагмента.'
+        )
+    return StaleCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
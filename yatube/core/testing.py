@@ -0,0 +1,53 @@
+"""Бюджет SQL-запросов для тестов представлений."""
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudget(ContextDecorator):
+    """Проверяет число и суммарное время SQL-запросов внутри блока.
+
+    Используется как контекстный менеджер или декоратор:
+    ``with QueryBudget(8, max_time=0.5): client.get('/')``.
+    """
+
+    def __init__(self, max_queries, max_time=None, using=DEFAULT_DB_ALIAS):
+        self.max_queries = max_queries
+        self.max_time = max_time
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            self.check()
+        return False
+
+    @property
+    def queries(self):
+        return self.context.captured_queries
+
+    @property
+    def total_time(self):
+        return sum(float(query['time']) for query in self.queries)
+
+    def report(self):
+        return '\n'.join(
+            f'{number}. [{query["time"]}] {query["sql"]}'
+            for number, query in enumerate(self.queries, start=1)
+        )
+
+    def check(self):
+        assert len(self.queries) <= self.max_queries, (
+            f'Выполнено {len(self.queries)} SQL-запросов при бюджете '
+            f'{self.max_queries}:\n{self.report()}'
+        )
+        assert self.max_time is None or self.total_time <= self.max_time, (
+            f'SQL-запросы заняли {self.total_time:.3f} с при бюджете '
+            f'{self.max_time} с:\n{self.report()}'
+        )
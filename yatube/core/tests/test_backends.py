@@ -0,0 +1,117 @@
+import importlib
+import importlib.util
+import os
+import sys
+import unittest
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from yatube.settings import databases, postgresql_database
+
+HAS_PSYCOPG2 = importlib.util.find_spec('psycopg2') is not None
+POOL_MODULE = 'core.backends.postgresql_pool.base'
+
+
+class DatabaseSettingsTest(SimpleTestCase):
+    def test_postgresql_without_pool(self):
+        """Без DB_POOL_SIZE — обычный бэкенд и постоянные соединения."""
+        with mock.patch.dict(os.environ, {}, clear=True):
+            database = postgresql_database('db')
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(database['HOST'], 'db')
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertEqual(
+            database['OPTIONS']['options'], '-c statement_timeout=5000'
+        )
+        self.assertNotIn('POOL', database)
+
+    def test_postgresql_with_pool(self):
+        """DB_POOL_SIZE включает пул и закрытие соединения после запроса."""
+        environ = {'DB_POOL_SIZE': '20', 'DB_STATEMENT_TIMEOUT': '300'}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            database = postgresql_database('db')
+        self.assertEqual(database['ENGINE'], 'core.backends.postgresql_pool')
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['POOL'], {'MIN_SIZE': 1, 'MAX_SIZE': 20})
+        self.assertEqual(
+            database['OPTIONS']['options'], '-c statement_timeout=300'
+        )
+        environ['DB_CONN_MAX_AGE'] = '30'
+        with mock.patch.dict(os.environ, environ, clear=True):
+            self.assertEqual(postgresql_database('db')['CONN_MAX_AGE'], 30)
+
+    def test_replica_aliases(self):
+        """Реплики получают алиасы replica_<n> и зеркалят default в тестах."""
+        with mock.patch.dict(os.environ, {'DB_HOST': 'primary'}, clear=True):
+            result = databases('postgresql', ['first', 'second'])
+        self.assertEqual(
+            list(result), ['default', 'replica_1', 'replica_2']
+        )
+        self.assertEqual(result['default']['HOST'], 'primary')
+        self.assertNotIn('TEST', result['default'])
+        self.assertEqual(result['replica_2']['HOST'], 'second')
+        self.assertEqual(result['replica_1']['TEST'], {'MIRROR': 'default'})
+        result = databases('sqlite', ['replica.sqlite3'])
+        self.assertEqual(result['replica_1']['NAME'], 'replica.sqlite3')
+        self.assertEqual(result['replica_1']['TEST'], {'MIRROR': 'default'})
+        self.assertEqual(list(databases('sqlite', [])), ['default'])
+
+
+class PoolBackendImportTest(SimpleTestCase):
+    def test_missing_psycopg2_reported(self):
+        """Без psycopg2 бэкенд сообщает, какой пакет поставить."""
+        with mock.patch.dict(sys.modules, {'psycopg2': None}):
+            sys.modules.pop(POOL_MODULE, None)
+            with self.assertRaisesMessage(ImproperlyConfigured, 'psycopg2'):
+                importlib.import_module(POOL_MODULE)
+
+
+@unittest.skipUnless(HAS_PSYCOPG2, 'нужен psycopg2')
+class PoolBackendTest(SimpleTestCase):
+    def setUp(self):
+        self.base = importlib.import_module(POOL_MODULE)
+        patcher = mock.patch.object(self.base.pool, 'ThreadedConnectionPool')
+        self.pool_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.base._pools.pop, 'pooled', None)
+
+    def wrapper(self, **options):
+        return self.base.DatabaseWrapper({
+            'ENGINE': 'core.backends.postgresql_pool',
+            'NAME': 'yatube', 'USER': '', 'PASSWORD': '', 'HOST': '',
+            'PORT': '', 'OPTIONS': options, 'TIME_ZONE': None,
+            'CONN_MAX_AGE': 0, 'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False,
+            'POOL': {'MIN_SIZE': 2, 'MAX_SIZE': 5}, 'TEST': {},
+        }, alias='pooled')
+
+    def test_connections_taken_from_one_pool(self):
+        """Соединения берутся из пула процесса, созданного один раз."""
+        first = self.wrapper().get_new_connection({'database': 'yatube'})
+        self.wrapper().get_new_connection({'database': 'yatube'})
+        self.pool_class.assert_called_once_with(2, 5, database='yatube')
+        pool = self.pool_class.return_value
+        self.assertIs(first, pool.getconn.return_value)
+        self.assertEqual(pool.getconn.call_count, 2)
+
+    def test_isolation_level_applied(self):
+        connection = self.pool_class.return_value.getconn.return_value
+        connection.isolation_level = 1
+        self.wrapper(isolation_level=2).get_new_connection({})
+        connection.set_session.assert_called_once_with(isolation_level=2)
+
+    def test_close_returns_connection_to_pool(self):
+        """После ошибок соединение закрывается, а не переиспользуется."""
+        wrapper = self.wrapper()
+        connection = wrapper.get_new_connection({})
+        connection.closed = 0
+        pool = self.pool_class.return_value
+        for errors_occurred in (False, True):
+            with self.subTest(errors_occurred=errors_occurred):
+                wrapper.connection = connection
+                wrapper.errors_occurred = errors_occurred
+                wrapper._close()
+                pool.putconn.assert_called_with(
+                    connection, close=errors_occurred
+                )
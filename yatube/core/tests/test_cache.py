@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+SHARED_LOCATION = tempfile.mkdtemp()
+
+
+def worker_caches(local_timeout):
+    """Два "воркера" с собственным L1 и общим файловым L2."""
+    shared = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_LOCATION,
+    }
+    config = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+    for worker in ('a', 'b'):
+        config[f'local_{worker}'] = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'local_{worker}',
+        }
+        config[f'shared_{worker}'] = shared
+        config[f'worker_{worker}'] = {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'OPTIONS': {
+                'LOCAL': f'local_{worker}',
+                'SHARED': f'shared_{worker}',
+                'LOCAL_TIMEOUT': local_timeout,
+            },
+        }
+    return config
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(SHARED_LOCATION, ignore_errors=True)
+        super().tearDownClass()
+
+    @override_settings(CACHES=worker_caches(local_timeout=1))
+    def test_writes_are_seen_by_other_workers(self):
+        """Запись одного воркера видна другому не позже LOCAL_TIMEOUT."""
+        worker_a, worker_b = caches['worker_a'], caches['worker_b']
+        worker_a.set_many({'post': 'текст', 'group': 'группа'})
+        self.assertEqual(
+            worker_b.get_many(['post', 'group']),
+            {'post': 'текст', 'group': 'группа'}
+        )
+        worker_a.set('post', 'правка')
+        worker_a.delete('group')
+        self.assertEqual(worker_b.get('post'), 'текст')
+        time.sleep(1.1)
+        self.assertEqual(worker_b.get('post'), 'правка')
+        self.assertIsNone(worker_b.get('group'))
+        worker_b.clear()
+        self.assertIsNone(worker_a.get('post'))
+
+    @override_settings(CACHES=worker_caches(local_timeout=60))
+    def test_local_tier_serves_hot_keys(self):
+        """Повторное чтение обслуживается из памяти процесса."""
+        worker_a = caches['worker_a']
+        worker_a.set('post', 'текст')
+        caches['shared_a'].clear()
+        self.assertEqual(worker_a.get('post'), 'текст')
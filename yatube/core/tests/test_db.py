@@ -0,0 +1,120 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, router
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.db import PIN_COOKIE, replica_reads
+from core.signals import set_journal_mode, tune_sqlite
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@replica_reads
+def read_view(request):
+    return router.db_for_read(Post), router.db_for_read(User)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_read_views_use_replica(self):
+        """Модели posts читаются из реплики, пользователи — из default."""
+        self.assertEqual(
+            read_view(self.factory.get('/')), ('replica', 'default')
+        )
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_pinned_user_reads_primary(self):
+        """После записи пользователь читает из основной БД."""
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(read_view(request), ('default', 'default'))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+
+
+@replica_reads
+def page_view(request):
+    """Счетчик, список и связанные объекты, как на странице группы."""
+    aliases = [router.db_for_read(model) for model in (Group, Post, Comment)]
+    aliases += read_view(request)[:1]
+    return aliases * 3
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicaPerRequestTest(TestCase):
+    def test_one_replica_per_request(self):
+        """Все чтения одного запроса идут в одну реплику."""
+        factory = RequestFactory()
+        chosen = set()
+        for _ in range(20):
+            aliases = set(page_view(factory.get('/')))
+            self.assertEqual(len(aliases), 1, aliases)
+            chosen |= aliases
+        self.assertLessEqual(chosen, {'replica_1', 'replica_2'})
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+
+class PrimaryPinTest(TestCase):
+    def test_writes_pin_user(self):
+        """Запросы на запись ставят cookie закрепления."""
+        user = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(user)
+        response = client.get(reverse('posts:main_page'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        response = client.get(
+            reverse('posts:profile_follow', args=(author.username,))
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = client.post(
+            reverse('posts:post_create'), {'text': 'новый пост'}
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+
+class SQLiteTuningTest(TestCase):
+    @override_settings(
+        SQLITE_PRAGMAS={'cache_size': -4321, 'busy_timeout': 1234}
+    )
+    def test_pragmas_applied_on_connect(self):
+        """Новое соединение SQLite получает PRAGMA из настроек."""
+        tune_sqlite(sender=connection.__class__, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4321)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+    def test_journal_mode_not_set_per_connection(self):
+        """Режим журнала не входит в PRAGMA каждого соединения."""
+        self.assertNotIn('journal_mode', settings.SQLITE_PRAGMAS)
+
+    @override_settings(SQLITE_JOURNAL_MODE='wal')
+    def test_journal_mode_set_after_migrate(self):
+        """После migrate файл БД переводится в WAL и остается в нем."""
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'journal.sqlite3')
+            database = dict(connection.settings_dict, NAME=name)
+            wrapper = DatabaseWrapper(database, alias='journal')
+            with mock.patch('core.signals.connections', {'journal': wrapper}):
+                set_journal_mode(sender=None, using='journal')
+            wrapper.close()
+            reopened = DatabaseWrapper(database, alias='journal')
+            with reopened.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+            reopened.close()
@@ -0,0 +1,80 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..metrics import registry
+
+User = get_user_model()
+
+
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.address = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def test_server_timing(self):
+        """Server-Timing содержит время, SQL, шаблоны и кеш."""
+        response = self.client.get(self.address)
+        timing = dict(
+            part.strip().split(';', 1)
+            for part in response['Server-Timing'].split(',')
+        )
+        self.assertEqual(set(timing), {'total', 'db', 'tpl', 'cache'})
+        self.assertNotIn('desc="0 queries"', timing['db'])
+        self.assertNotEqual(timing['tpl'], 'dur=0.0')
+
+    def test_metrics_endpoint(self):
+        """Метрики накапливаются по имени представления."""
+        self.client.get(self.address)
+        self.client.get(self.address)
+        response = self.client.get(reverse('metrics'))
+        text = response.content.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            text,
+            r'yatube_requests_total\{pid="\d+",view="posts:post_detail",'
+            r'method="GET",status="200"\} 2'
+        )
+        self.assertIn('le="+Inf"} 2', text)
+        self.assertRegex(
+            text, r'yatube_db_queries_total\{[^}]*posts:post_detail"\} [1-9]'
+        )
+
+    def test_metrics_hidden_from_public(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token_required_behind_proxy(self):
+        """С METRICS_TOKEN адрес 127.0.0.1 без токена не пускается."""
+        address = reverse('metrics')
+        self.assertEqual(self.client.get(address).status_code, 404)
+        response = self.client.get(
+            address, HTTP_AUTHORIZATION='Bearer wrong'
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            address, HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SLOW_REQUEST_SECONDS=0, SLOW_REQUEST_SAMPLE_RATE=1)
+    def test_slow_request_logged_with_sql(self):
+        """Медленный запрос попадает в журнал вместе с SQL."""
+        with self.assertLogs('yatube.slow_requests') as logs:
+            self.client.get(self.address)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:post_detail')
+        self.assertEqual(len(record['queries']), record['sql_count'])
+        self.assertIn('posts_post', record['queries'][0]['sql'])
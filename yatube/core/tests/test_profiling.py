@@ -0,0 +1,83 @@
+import os
+import pstats
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import profiling
+
+User = get_user_model()
+PROFILE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(PROFILE_DIR=PROFILE_DIR, PROFILE_SAMPLE_INTERVAL=0.001)
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        profiling.results.__init__()
+        self.address = reverse('posts:profile', args=(self.user.username,))
+        self.client.force_login(self.staff)
+
+    def control(self, **data):
+        return self.client.post(reverse('profiling'), data).json()
+
+    def test_staff_only(self):
+        """Управление профилированием доступно только персоналу."""
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('profiling'), {'rate': 100})
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(profiling.get_config())
+
+    def test_cprofile_dump_per_view(self):
+        """Профили копятся по имени представления и пишутся в pstats."""
+        config = self.control(rate=100, views='posts:profile')['config']
+        self.assertEqual(config['views'], ['posts:profile'])
+        self.client.get(self.address)
+        self.client.get(self.address)
+        self.client.get(reverse('posts:main_page'))
+        status = self.control(dump=1)
+        self.assertEqual(status['profiled'], {'posts:profile': 2})
+        [path] = status['files']
+        self.assertEqual(
+            os.path.basename(path), f'posts-profile.{os.getpid()}.pstats'
+        )
+        functions = {
+            name for _, _, name in pstats.Stats(path).stats
+        }
+        self.assertIn('profile', functions)
+
+    def test_sample_mode_writes_collapsed_stacks(self):
+        self.control(rate=100, mode='sample')
+        for _ in range(200):
+            self.client.get(self.address)
+            if any(profiling.results.stacks.values()):
+                break
+        [path] = self.control(dump=1)['files']
+        self.assertTrue(path.endswith('.collapsed'))
+        with open(path, encoding='utf-8') as collapsed:
+            stack, count = collapsed.readline().rsplit(' ', 1)
+        self.assertIn(';', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_disabled_by_zero_rate(self):
+        self.control(rate=100)
+        self.assertIsNone(self.control(rate=0)['config'])
+        self.client.get(self.address)
+        self.assertEqual(dict(profiling.results.requests), {})
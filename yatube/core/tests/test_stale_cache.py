@@ -0,0 +1,130 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from ..stale_cache import get_or_compute, lock_key
+
+
+def fail():
+    raise AssertionError('Значение не должно пересчитываться.')
+
+
+def two_workers():
+    """Два TwoTierCache со своим L1 и общим L2 (locmem одного процесса)."""
+    config = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+    for worker in ('a', 'b'):
+        config[f'local_{worker}'] = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'stale_local_{worker}',
+        }
+        config[f'worker_{worker}'] = {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'OPTIONS': {
+                'LOCAL': f'local_{worker}',
+                'SHARED': 'shared',
+                'LOCAL_TIMEOUT': 60,
+            },
+        }
+    config['shared'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stale_shared',
+    }
+    return config
+
+
+@override_settings(CACHE_EARLY_BETA=0, CACHE_LOCK_TIMEOUT=5)
+class StaleCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def expire(self, key, value):
+        cache.set(key, (value, time.time() - 1, 0.01), 60)
+
+    def test_fresh_value_served_from_cache(self):
+        self.assertEqual(get_or_compute('key', lambda: 1, 60), 1)
+        self.assertEqual(get_or_compute('key', fail, 60), 1)
+
+    def test_stale_served_while_another_request_recomputes(self):
+        """Пока пересчет занят другим запросом, отдается старое значение."""
+        self.expire('key', 'старое')
+        cache.add(lock_key('key'), True, 5)
+        self.assertEqual(get_or_compute('key', fail, 60), 'старое')
+        cache.delete(lock_key('key'))
+        self.assertEqual(get_or_compute('key', lambda: 'новое', 60), 'новое')
+        self.assertIsNone(cache.get(lock_key('key')))
+
+    def test_single_flight_on_cold_key(self):
+        """Одновременные промахи вызывают одно вычисление."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'значение'
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    get_or_compute('cold', compute, 60)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['значение'] * 5)
+
+    def test_foreign_lock_not_released(self):
+        """Чужую блокировку, взятую после истечения нашей, не снимаем."""
+        lock = lock_key('key')
+
+        def compute():
+            cache.coherent.delete(lock)
+            cache.coherent.add(lock, 'чужая', 5)
+            return 'значение'
+        self.assertEqual(get_or_compute('key', compute, 60), 'значение')
+        self.assertEqual(cache.coherent.get(lock), 'чужая')
+
+    @override_settings(CACHES=two_workers())
+    def test_single_flight_across_workers(self):
+        """Устаревшая копия в L1 воркера не запускает второй пересчет."""
+        worker_a, worker_b = caches['worker_a'], caches['worker_b']
+        worker_b.set('key', ('старое', time.time() - 1, 0.01), 60)
+        with mock.patch('core.stale_cache.cache', worker_a):
+            self.assertEqual(
+                get_or_compute('key', lambda: 'новое', 60), 'новое'
+            )
+        self.assertEqual(worker_b.get('key')[0], 'старое')
+        with mock.patch('core.stale_cache.cache', worker_b):
+            self.assertEqual(get_or_compute('key', fail, 60), 'новое')
+
+    @override_settings(CACHE_EARLY_BETA=10 ** 6)
+    def test_probabilistic_early_expiration(self):
+        """Дорогое значение пересчитывается до истечения срока."""
+        cache.set('key', ('старое', time.time() + 30, 1), 60)
+        self.assertEqual(get_or_compute('key', lambda: 'новое', 60), 'новое')
+
+    def test_not_cached_when_rejected(self):
+        get_or_compute('key', lambda: None, 60, cache_if=bool)
+        self.assertIsNone(cache.get('key'))
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load stale_cache %}'
+            '{% stale_cache 60 fragment name %}{{ value }}{% endstale_cache %}'
+        )
+
+        def render(**context):
+            return template.render(Context(context))
+        self.assertEqual(render(name='a', value=1), '1')
+        self.assertEqual(render(name='a', value=2), '1')
+        self.assertEqual(render(name='b', value=3), '3')
@@ -1,5 +1,14 @@
+import hmac
+import os
 from http import HTTPStatus
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
+
+from . import profiling
+from .metrics import registry
 
 
 def page_not_found(request, exception):
@@ -20,3 +29,59 @@ def server_error(request):
     return render(
         request, 'core/500.html', status=HTTPStatus.INTERNAL_SERVER_ERROR
     )
+
+
+def metrics_allowed(request):
+    """Сборщик узнается по токену, а без METRICS_TOKEN — по адресу."""
+    if request.user.is_staff:
+        return True
+    if settings.METRICS_TOKEN:
+        return hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', ''),
+            f'Bearer {settings.METRICS_TOKEN}'
+        )
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    """Метрики в формате Prometheus: для сборщика и персонала.
+
+    Реестр свой у каждого процесса, поэтому ответ содержит только
+    воркер, обработавший запрос (метки pid). Сумма по сайту получается
+    в Prometheus из нескольких выборок, а не из одной.
+    """
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
+
+
+@require_http_methods(['GET', 'POST'])
+def profiling_control(request):
+    """Состояние профилирования; POST меняет настройки или сбрасывает
+    накопленное этим воркером на диск (dump=1)."""
+    if not request.user.is_staff:
+        raise Http404
+    files = []
+    if request.method == 'POST':
+        if request.POST.get('dump'):
+            files = profiling.results.dump()
+        else:
+            mode = request.POST.get('mode', 'cprofile')
+            try:
+                rate = float(request.POST.get('rate', 0))
+                minutes = float(request.POST.get('minutes', 10))
+            except ValueError:
+                return JsonResponse({'error': 'rate, minutes'}, status=400)
+            if mode not in profiling.MODES:
+                return JsonResponse({'error': 'mode'}, status=400)
+            views = filter(None, request.POST.get('views', '').split(','))
+            profiling.configure(rate, mode, views, minutes)
+    return JsonResponse({
+        'config': profiling.get_config(),
+        'pid': os.getpid(),
+        'profiled': dict(profiling.results.requests),
+        'directory': settings.PROFILE_DIR,
+        'files': files,
+    })
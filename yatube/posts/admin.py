@@ -10,6 +10,7 @@ class PostAdmin(admin.ModelAdmin):
         'pk',
         'text',
         'pub_date',
+        'updated_at',
         'author',
         'group',)
     list_editable = ('group',)
@@ -0,0 +1,259 @@
+"""JSON API v1 для чтения: лента, группа, автор, пост и подписки.
+
+Списки строятся через values() только по запрошенным полям (?fields=),
+без создания моделей, и листаются keyset-курсором (?cursor=, ?limit=).
+Готовый JSON хранится в кеше под ключом, включающим время изменения
+страницы из freshness, поэтому правки сразу дают новый ключ, а
+повторные запросы отдаются без обращения к постам. В области списков
+входят и счетчики комментариев (freshness.with_comments): comments_count
+есть только в API, HTML-страницы от комментариев не меняются.
+"""
+import hashlib
+import json
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+
+from core.db import replica_reads
+
+from . import freshness
+from .counters import user_stats
+from .models import Post
+from .timeline import timeline_posts
+from .utils import CURSOR_NEXT, decode_cursor, encode_key, keyset
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated_at': 'updated_at',
+    'version': 'version',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'thumbnail': 'thumbnail_url',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = ('id', 'author__username', 'text', 'created')
+
+
+class ApiError(Exception):
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def api_view(view):
+    """Ошибки ApiError превращаются в JSON-ответ с их статусом."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse({'detail': 'Метод не разрешен.'}, status=405)
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'detail': error.detail}, status=error.status)
+    return wrapper
+
+
+def requested_fields(request, extra=()):
+    allowed = [*POST_FIELDS, *extra]
+    value = request.GET.get('fields')
+    if not value:
+        return allowed
+    fields = list(dict.fromkeys(filter(None, value.split(','))))
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ApiError(
+            'Неизвестные поля: {}. Доступны: {}.'.format(
+                ', '.join(sorted(unknown)), ', '.join(allowed)
+            )
+        )
+    return fields
+
+
+def requested_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.LIMITED))
+    except ValueError:
+        raise ApiError('limit должен быть числом.')
+    if not 1 <= limit <= settings.API_MAX_LIMIT:
+        raise ApiError(f'limit должен быть от 1 до {settings.API_MAX_LIMIT}.')
+    return limit
+
+
+def present(name, value):
+    if name == 'image':
+        return default_storage.url(value) if value else None
+    if name == 'thumbnail':
+        return value or None
+    return value
+
+
+def project(row, fields):
+    return {name: present(name, row[POST_FIELDS[name]]) for name in fields}
+
+
+def post_page(request, queryset, fields):
+    """Страница постов по курсору: {'results': [...], 'next': курсор}.
+
+    queryset — список постов или функция с аргументами utils.keyset.
+    """
+    limit = requested_limit(request)
+    cursor = request.GET.get('cursor')
+    decoded = decode_cursor(cursor) if cursor else None
+    if cursor and (decoded is None or decoded[0] != CURSOR_NEXT):
+        raise ApiError('Неверный курсор.')
+    _, pub_date, pk = decoded or (None, None, None)
+    if callable(queryset):
+        queryset = queryset(pub_date=pub_date, pk=pk)
+    else:
+        queryset = keyset(queryset, pub_date=pub_date, pk=pk)
+    lookups = {POST_FIELDS[name] for name in fields} | {'pub_date', 'id'}
+    rows = list(queryset.values(*lookups)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_key(last['pub_date'], last['id'])
+    return {
+        'results': [project(row, fields) for row in rows[:limit]],
+        'next': next_cursor,
+    }
+
+
+def render(payload):
+    return json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def cached_response(request, build):
+    """JSON из кеша по адресу, параметрам и времени изменения страницы."""
+    stamp = freshness.page_stamp(request)
+    if stamp is None:
+        body = render(build())
+    else:
+        key = 'api:v1:' + hashlib.md5('|'.join((
+            request.path,
+            request.GET.get('fields', ''),
+            request.GET.get('cursor', ''),
+            request.GET.get('limit', ''),
+            str(stamp.timestamp()),
+        )).encode()).hexdigest()
+        body = cache.get(key)
+        if body is None:
+            body = render(build())
+            cache.set(key, body, settings.API_CACHE_TIME)
+    return HttpResponse(body, content_type='application/json')
+
+
+def not_found():
+    raise ApiError('Не найдено.', status=404)
+
+
+@api_view
+@replica_reads
+@freshness.conditional(freshness.with_comments(freshness.index_scopes))
+def posts(request):
+    fields = requested_fields(request)
+    return cached_response(
+        request, lambda: post_page(request, Post.objects.all(), fields)
+    )
+
+
+@api_view
+@replica_reads
+@freshness.conditional(freshness.with_comments(freshness.group_scopes))
+def group(request, slug):
+    group = freshness.page_object(request) or not_found()
+    fields = requested_fields(request)
+
+    def build():
+        return {
+            'group': {
+                'slug': group.slug,
+                'title': group.title,
+                'description': group.description,
+                'posts_count': group.posts_count,
+            },
+            'posts': post_page(
+                request, Post.objects.filter(group_id=group.pk), fields
+            ),
+        }
+    return cached_response(request, build)
+
+
+@api_view
+@replica_reads
+@freshness.conditional(freshness.with_comments(freshness.profile_scopes))
+def profile(request, username):
+    author = freshness.page_object(request) or not_found()
+    fields = requested_fields(request)
+
+    def build():
+        stats = user_stats(author)
+        return {
+            'profile': {
+                'username': author.username,
+                'full_name': author.get_full_name(),
+                'posts_count': stats.posts_count,
+                'followers_count': stats.followers_count,
+                'following_count': stats.following_count,
+            },
+            'posts': post_page(
+                request, Post.objects.filter(author_id=author.pk), fields
+            ),
+        }
+    return cached_response(request, build)
+
+
+@api_view
+@replica_reads
+@freshness.conditional(freshness.post_scopes)
+def post_detail(request, post_id):
+    post = freshness.page_object(request) or not_found()
+    fields = requested_fields(request, extra=('comments',))
+
+    def build():
+        row = {
+            'id': post.pk,
+            'text': post.text,
+            'pub_date': post.pub_date,
+            'updated_at': post.updated_at,
+            'version': post.version,
+            'author__username': post.author.username,
+            'group__slug': post.group.slug if post.group else None,
+            'image': post.image.name,
+            'thumbnail_url': post.thumbnail_url,
+            'comments_count': post.comments_count,
+        }
+        data = project(row, [name for name in fields if name != 'comments'])
+        if 'comments' in fields:
+            data['comments'] = [
+                {
+                    'id': comment['id'],
+                    'author': comment['author__username'],
+                    'text': comment['text'],
+                    'created': comment['created'],
+                }
+                for comment in post.comments.values(*COMMENT_FIELDS)[
+                    :settings.COMMENTS_LIMITED
+                ]
+            ]
+        return data
+    return cached_response(request, build)
+
+
+@api_view
+@replica_reads
+def follow(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Требуется авторизация.', status=401)
+    fields = requested_fields(request)
+    return JsonResponse(
+        post_page(request, partial(timeline_posts, request.user), fields),
+        json_dumps_params={'ensure_ascii': False},
+    )
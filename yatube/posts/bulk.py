@@ -0,0 +1,237 @@
+"""Потоковый перенос групп, постов, комментариев и подписок.
+
+Данные читаются и пишутся пачками (keyset по id при выгрузке,
+bulk_create при загрузке), поэтому память не растет с объемом.
+После каждой пачки в файл <данные>.checkpoint записывается позиция:
+прерванную выгрузку или загрузку можно продолжить с --resume.
+Первичные ключи сохраняются, пользователи переносятся отдельно.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import counters, timeline
+from .models import Comment, Follow, Group, Post
+from .search import get_backend
+
+# Порядок важен: загрузка идет от таблиц, на которые ссылаются другие.
+TABLES = {
+    'groups': (Group, ('id', 'title', 'slug', 'description')),
+    'posts': (
+        Post, ('id', 'text', 'pub_date', 'updated_at', 'version',
+               'author_id', 'group_id', 'image')
+    ),
+    'comments': (
+        Comment, ('id', 'post_id', 'author_id', 'text', 'created')
+    ),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+}
+FORMATS = ('jsonl', 'csv')
+
+
+def automatic_dates(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Позволяет задать даты полям с auto_now(_add) при bulk_create."""
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def rebuild_derived():
+    """Пересчитывает то, что bulk_create не обновляет сигналами."""
+    counters.reconcile()
+    timeline.rebuild()
+    get_backend().rebuild()
+
+
+def data_path(directory, table, data_format):
+    return os.path.join(directory, f'{table}.{data_format}')
+
+
+def read_checkpoint(path):
+    try:
+        with open(f'{path}.checkpoint', encoding='utf-8') as checkpoint:
+            return json.load(checkpoint)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, **state):
+    temporary = f'{path}.checkpoint.tmp'
+    with open(temporary, 'w', encoding='utf-8') as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(temporary, f'{path}.checkpoint')
+
+
+def clear_checkpoint(path):
+    try:
+        os.remove(f'{path}.checkpoint')
+    except FileNotFoundError:
+        pass
+
+
+def serialize(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export_table(table, path, data_format, chunk_size, resume=False):
+    """Выгружает таблицу в файл; возвращает число записанных строк."""
+    model, fields = TABLES[table]
+    state = read_checkpoint(path) if resume else None
+    last_pk = state['last_pk'] if state else 0
+    written = 0
+    with open(path, 'a+' if state else 'w', encoding='utf-8',
+              newline='') as output:
+        if state:
+            output.seek(state['offset'])
+            output.truncate()
+        writer = csv.writer(output) if data_format == 'csv' else None
+        if writer and not state:
+            writer.writerow(fields)
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list(*fields)[:chunk_size]
+            )
+            if not rows:
+                break
+            for row in rows:
+                row = [serialize(value) for value in row]
+                if writer:
+                    writer.writerow(['' if value is None else value
+                                     for value in row])
+                else:
+                    output.write(json.dumps(
+                        dict(zip(fields, row)), ensure_ascii=False
+                    ) + '\n')
+            output.flush()
+            last_pk = rows[-1][0]
+            written += len(rows)
+            write_checkpoint(path, last_pk=last_pk, offset=output.tell())
+    clear_checkpoint(path)
+    return written
+
+
+def read_chunks(source, fields, data_format, chunk_size):
+    """Пачки строк файла и позиция сразу после каждой пачки."""
+    lines = iter(source.readline, '')
+    if data_format == 'csv':
+        rows = (dict(zip(fields, row)) for row in csv.reader(lines))
+    else:
+        rows = (json.loads(line) for line in lines if line.strip())
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk, source.tell()
+
+
+def build_objects(model, fields, rows):
+    objects = []
+    for row in rows:
+        values = {}
+        for name in fields:
+            field = model._meta.get_field(name)
+            value = row.get(name)
+            if value == '' and field.null:
+                value = None
+            values[field.attname] = field.to_python(value)
+        objects.append(model(**values))
+    return objects
+
+
+def save_chunk(model, objects, batch_size, close_connection=False):
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(
+                objects, batch_size=batch_size, ignore_conflicts=True
+            )
+    finally:
+        if close_connection:
+            connection.close()
+
+
+def import_table(table, path, data_format, chunk_size, resume=False,
+                 workers=1, batch_size=None):
+    """Загружает таблицу из файла; возвращает число загруженных строк."""
+    model, fields = TABLES[table]
+    state = read_checkpoint(path) if resume else None
+    with open(path, encoding='utf-8', newline='') as source, \
+            explicit_dates(*automatic_dates(model)):
+        if data_format == 'csv':
+            fields = next(csv.reader([source.readline()]))
+        if state:
+            source.seek(state['offset'])
+        chunks = read_chunks(source, fields, data_format, chunk_size)
+        if workers > 1:
+            imported = _import_parallel(
+                model, fields, chunks, path, workers, batch_size
+            )
+        else:
+            imported = 0
+            for rows, offset in chunks:
+                save_chunk(model, build_objects(model, fields, rows),
+                           batch_size)
+                imported += len(rows)
+                write_checkpoint(path, offset=offset)
+    clear_checkpoint(path)
+    reset_sequence(model)
+    return imported
+
+
+def _import_parallel(model, fields, chunks, path, workers, batch_size):
+    """Пачки пишутся в потоках, позиция сохраняется по порядку пачек.
+
+    В очереди не больше 2 * workers пачек, чтобы не читать файл в память.
+    """
+    imported = 0
+    pending = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for rows, offset in chunks:
+            future = executor.submit(
+                save_chunk, model, build_objects(model, fields, rows),
+                batch_size, close_connection=True
+            )
+            pending.append((future, len(rows), offset))
+            while len(pending) >= 2 * workers:
+                imported += _finish(pending.pop(0), path)
+        for item in pending:
+            imported += _finish(item, path)
+    return imported
+
+
+def _finish(item, path):
+    future, size, offset = item
+    future.result()
+    write_checkpoint(path, offset=offset)
+    return size
+
+
+def reset_sequence(model):
+    """После вставки явных id сдвигает счетчик id (PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -0,0 +1,46 @@
+"""Кеш отрисованных карточек постов (posts/includes/post_data.html).
+
+Карточка не зависит от пользователя, поэтому одна и та же запись
+кеша используется в index, group_posts, profile и follow_index.
+Страница собирается одним get_many, отрисовываются только промахи.
+Ключ включает Post.version и отпечаток имени автора, поэтому правка
+поста или переименование автора сами уводят карточку на новый ключ,
+а старая запись истекает по таймауту.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'posts/includes/post_data.html'
+
+
+def author_mark(author):
+    """Отпечаток имени автора, показанного в карточке."""
+    name = f'{author.username}|{author.get_full_name()}'
+    return hashlib.md5(name.encode()).hexdigest()[:8]
+
+
+def card_key(post):
+    return 'post_card:{}:{}:{}:{}'.format(
+        settings.POST_CARD_VERSION, post.pk, post.version,
+        author_mark(post.author)
+    )
+
+
+def render_cards(posts):
+    """Возвращает пары (пост, html карточки) в исходном порядке."""
+    posts = list(posts)
+    cached = cache.get_many([card_key(post) for post in posts])
+    missing = {}
+    cards = []
+    for post in posts:
+        key = card_key(post)
+        if key not in cached:
+            missing[key] = render_to_string(CARD_TEMPLATE, {'post': post})
+        cards.append((post, mark_safe(cached.get(key, missing.get(key)))))
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIME)
+    return cards
@@ -0,0 +1,87 @@
+"""Денормализованные счетчики вместо COUNT(*) при отрисовке страниц.
+
+Счетчики меняются F()-выражениями в сигналах сохранения и удаления
+Post, Comment и Follow. Массовые операции сигналы не вызывают,
+расхождения исправляет команда ``manage.py reconcile_counters``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import freshness
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+POSTS_TOTAL_KEY = 'posts_total_count'
+
+
+def increment(queryset, field, delta=1):
+    queryset.update(**{field: F(field) + delta})
+
+
+def user_stats(user):
+    """Счетчики пользователя; недостающую строку создает на лету."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        user.stats = UserStats.objects.get_or_create(user=user)[0]
+        return user.stats
+
+
+def posts_total():
+    """Количество всех постов, хранится в кеше до первого изменения."""
+    total = cache.get(POSTS_TOTAL_KEY)
+    if total is None:
+        total = Post.objects.count()
+        cache.set(POSTS_TOTAL_KEY, total, settings.COUNTERS_CACHE_TIME)
+    return total
+
+
+def reset_posts_total():
+    cache.delete(POSTS_TOTAL_KEY)
+
+
+def timeline_total(user):
+    """Количество постов в ленте подписок по счетчикам авторов."""
+    return UserStats.objects.filter(
+        user__following__user=user
+    ).aggregate(total=Coalesce(Sum('posts_count'), 0))['total']
+
+
+def _subquery_count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def reconcile():
+    """Пересчитывает все счетчики по данным таблиц.
+
+    Пересчет идет после массовых записей, поэтому заодно сдвигает
+    общую отметку freshness: страницы и кеши по ней строятся заново.
+    """
+    with transaction.atomic():
+        existing = UserStats.objects.values_list('user_id', flat=True)
+        UserStats.objects.bulk_create(
+            (
+                UserStats(user_id=user_id)
+                for user_id in User.objects.exclude(
+                    pk__in=existing
+                ).values_list('pk', flat=True).iterator()
+            ),
+            batch_size=settings.TIMELINE_BATCH_SIZE,
+        )
+        UserStats.objects.update(
+            posts_count=_subquery_count(Post, 'author'),
+            followers_count=_subquery_count(Follow, 'author'),
+            following_count=_subquery_count(Follow, 'user'),
+        )
+        Group.objects.update(posts_count=_subquery_count(Post, 'group'))
+        Post.objects.update(comments_count=_subquery_count(Comment, 'post'))
+        freshness.touch_all()
+    reset_posts_total()
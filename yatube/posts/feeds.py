@@ -0,0 +1,140 @@
+"""RSS и Atom: все посты, посты группы и посты автора.
+
+Лента собирается из проекции последних FEED_SIZE постов (values(),
+без моделей), которая хранится в кеше под ключом со временем изменения
+области из freshness: сохранение или удаление поста сдвигает отметку,
+и следующий запрос строит проекцию заново. Представления обернуты в
+freshness.conditional, поэтому опрос без изменений получает 304.
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import Http404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from . import freshness
+from .models import Post
+
+ITEM_FIELDS = (
+    'id', 'text', 'pub_date', 'updated_at', 'author__username',
+    'group__title',
+)
+
+
+def latest_posts(scope, queryset):
+    """Последние посты области freshness из кеша."""
+    key = 'feed:{}:{}'.format(
+        scope, freshness.changed_at([scope]).timestamp()
+    )
+    items = cache.get(key)
+    if items is None:
+        items = list(
+            queryset.order_by('-pub_date', '-id')
+            .values(*ITEM_FIELDS)[:settings.FEED_SIZE]
+        )
+        cache.set(key, items, settings.POST_CARD_CACHE_TIME)
+    return items
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: новые записи'
+    description = 'Последние записи всех авторов.'
+
+    def link(self):
+        return reverse('posts:main_page')
+
+    def items(self):
+        return latest_posts(freshness.ALL_POSTS, Post.objects.all())
+
+    def item_title(self, item):
+        return item['text'][:settings.POST_LIMITER]
+
+    def item_description(self, item):
+        return item['text']
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item['id'],))
+
+    def item_pubdate(self, item):
+        return item['pub_date']
+
+    def item_updateddate(self, item):
+        return item['updated_at']
+
+    def item_author_name(self, item):
+        return item['author__username']
+
+    def item_categories(self, item):
+        return [item['group__title']] if item['group__title'] else []
+
+
+class PageObjectFeed(LatestPostsFeed):
+    """Лента группы или автора, загруженных freshness.conditional."""
+
+    def get_object(self, request, *args, **kwargs):
+        page_object = freshness.page_object(request)
+        if page_object is None:
+            raise Http404
+        return page_object
+
+
+class GroupPostsFeed(PageObjectFeed):
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=(group.slug,))
+
+    def items(self, group):
+        return latest_posts(
+            freshness.group_scope(group.pk),
+            Post.objects.filter(group_id=group.pk)
+        )
+
+
+class AuthorPostsFeed(PageObjectFeed):
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}.'
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def items(self, author):
+        return latest_posts(
+            freshness.author_scope(author.pk),
+            Post.objects.filter(author_id=author.pk)
+        )
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj=None):
+        return self._get_dynamic_attr('description', obj)
+
+
+def feed_views(feed_class, scopes):
+    """RSS- и Atom-представления ленты с условным GET."""
+    atom_class = type(
+        f'Atom{feed_class.__name__}', (AtomMixin, feed_class), {}
+    )
+    return (
+        freshness.conditional(scopes)(feed_class()),
+        freshness.conditional(scopes)(atom_class()),
+    )
+
+
+latest_rss, latest_atom = feed_views(
+    LatestPostsFeed, freshness.index_scopes
+)
+group_rss, group_atom = feed_views(GroupPostsFeed, freshness.group_scopes)
+author_rss, author_atom = feed_views(
+    AuthorPostsFeed, freshness.profile_scopes
+)
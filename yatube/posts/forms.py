@@ -1,5 +1,8 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 
+from .images import inspect, optimize_upload
 from .models import Post, Comment
 
 
@@ -8,6 +11,39 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        image = self.files.get('image')
+        self.image_too_large = bool(image) and (
+            getattr(image, 'too_large', False)
+            or image.size > settings.POST_IMAGE_MAX_BYTES
+        )
+        if self.image_too_large:
+            # Обрезанный SizeLimitedUploadHandler файл не открылся бы
+            # в ImageField, и вместо размера пользователь увидел бы
+            # ошибку о неверной картинке.
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.image_too_large:
+            raise forms.ValidationError(
+                'Картинка больше '
+                f'{filesizeformat(settings.POST_IMAGE_MAX_BYTES)}.',
+                code='file_too_large',
+            )
+        image = self.cleaned_data.get('image')
+        if not image or 'image' not in self.files:
+            return image
+        width, height, needs_optimizing = inspect(image)
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                f'Картинка слишком большая: {width}x{height} пикселей.'
+            )
+        if needs_optimizing:
+            return optimize_upload(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
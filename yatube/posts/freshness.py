@@ -0,0 +1,261 @@
+"""Условные GET (ETag / Last-Modified) для лент и страницы поста.
+
+Для каждой области (вся лента, группа, автор, пост) в кеше хранится
+время последнего изменения; сигналы обновляют его при записи. Валидатор
+страницы — максимум времен ее областей, поэтому ответ 304 отдается
+без выборки постов и отрисовки шаблона. Группа, автор или пост,
+нужные для списка областей, загружаются один раз: представление берет
+их через page_object.
+
+Если отметка вытеснена из кеша, она заводится заново текущим временем:
+клиент один раз получит страницу целиком. У поста учитывается и его
+updated_at, поэтому правка видна в валидаторе, даже если отметка
+потерялась.
+
+Массовые записи (bulk_create, update) сигналов не шлют. Для них есть
+общая отметка EPOCH: она входит в каждую страницу, и touch_all после
+пересчета (counters.reconcile) сдвигает валидаторы и ключи кешей,
+построенные по changed_at, у всех страниц сразу.
+
+Отметки читаются и пишутся напрямую в общий уровень кеша (cache.shared),
+минуя память воркера, и хранятся без срока. Поэтому общее хранилище
+должно быть одним на все процессы (memcached, redis, file): с locmem у
+каждого воркера свои отметки, и ETag одной страницы в разных воркерах
+не совпадают.
+
+ETag описывает то, что действительно отрисовано. Ответ из кеша страниц
+несет отметку, с которой его собирали (remember_stamp), и валидаторы
+строятся по ней. Пока изменение могло не дойти до реплик
+(REPLICA_PIN_SECONDS при DATABASE_REPLICAS), валидаторов нет совсем:
+иначе устаревшую страницу с реплики закрепил бы новый ETag.
+"""
+from calendar import timegm
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Comment, Group, Post, User
+
+KEY = 'changed_at:{}'
+ALL_POSTS = 'posts'
+EPOCH = 'epoch'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def comments_scope(scope):
+    """Счетчики комментариев постов области (видны только в API)."""
+    return f'comments:{scope}'
+
+
+def stamps():
+    """Хранилище отметок: общий уровень кеша, без копий в воркерах."""
+    return getattr(cache, 'shared', cache)
+
+
+def touch(*scopes):
+    """Отмечает изменение областей.
+
+    Отметка ставится сразу и еще раз после коммита: запрос, прочитавший
+    данные до коммита, не закрепит их под новой отметкой.
+    """
+    def mark():
+        now = timezone.now()
+        stamps().set_many({KEY.format(scope): now for scope in scopes}, None)
+    mark()
+    transaction.on_commit(mark)
+
+
+def touch_post(post, previous_group_id=None):
+    """Пост виден в общей ленте, ленте группы, профиле и на своей странице."""
+    scopes = [ALL_POSTS, author_scope(post.author_id), post_scope(post.pk)]
+    for group_id in {post.group_id, previous_group_id} - {None}:
+        scopes.append(group_scope(group_id))
+    touch(*scopes)
+
+
+def touch_comments(post):
+    """Комментарий меняет страницу поста и comments_count в списках API.
+
+    Ленты, группы и профили в HTML счетчик не показывают, поэтому их
+    валидаторы не сдвигаются.
+    """
+    scopes = [ALL_POSTS, author_scope(post.author_id)]
+    if post.group_id:
+        scopes.append(group_scope(post.group_id))
+    touch(post_scope(post.pk), *map(comments_scope, scopes))
+
+
+def touch_author(author_id):
+    """Имя автора видно во всех списках с его постами и комментариями."""
+    group_ids = Post.objects.filter(
+        author_id=author_id, group__isnull=False
+    ).order_by().values_list('group_id', flat=True).distinct()
+    commented_ids = Comment.objects.filter(
+        author_id=author_id
+    ).order_by().values_list('post_id', flat=True).distinct()
+    touch(
+        ALL_POSTS, author_scope(author_id),
+        *map(group_scope, group_ids), *map(post_scope, commented_ids)
+    )
+
+
+def touch_all():
+    """Отмечает изменение всех страниц после массовой записи."""
+    touch(EPOCH)
+
+
+def replica_lag():
+    seconds = settings.REPLICA_PIN_SECONDS if settings.DATABASE_REPLICAS else 0
+    return timedelta(seconds=seconds)
+
+
+def changed_at(scopes):
+    """Время изменения областей с учетом общей отметки EPOCH.
+
+    Заведенная заново EPOCH не отвечает никакой записи, поэтому
+    считается уже дошедшей до реплик и не снимает валидаторы.
+    """
+    storage = stamps()
+    keys = [KEY.format(scope) for scope in (EPOCH, *scopes)]
+    found = storage.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        now = timezone.now()
+        for key in missing:
+            seed = now - replica_lag() if key == keys[0] else now
+            storage.add(key, seed, None)
+        found.update(storage.get_many(missing))
+    return max(found.values())
+
+
+def settled(stamp):
+    """Изменение, отмеченное stamp, уже видно на репликах."""
+    return timezone.now() - stamp >= replica_lag()
+
+
+def index_scopes(request):
+    return [ALL_POSTS]
+
+
+def with_comments(scopes):
+    """Области списка постов API: страницы и счетчиков комментариев."""
+    def api_scopes(request, *args, **kwargs):
+        names = scopes(request, *args, **kwargs)
+        return names and [*names, *map(comments_scope, names)]
+    return api_scopes
+
+
+def page_object(request):
+    """Объект страницы, уже загруженный при вычислении валидаторов."""
+    return getattr(request, '_page_object', None)
+
+
+def group_scopes(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    request._page_object = group
+    return None if group is None else [group_scope(group.pk)]
+
+
+def profile_scopes(request, username):
+    author = User.objects.select_related('stats').filter(
+        username=username
+    ).first()
+    request._page_object = author
+    return None if author is None else [author_scope(author.pk)]
+
+
+def post_scopes(request, post_id):
+    post = Post.objects.select_related('author__stats', 'group').filter(
+        pk=post_id
+    ).first()
+    request._page_object = post
+    if post is None:
+        return None
+    return [post_scope(post.pk), author_scope(post.author_id)]
+
+
+def page_stamp(request):
+    """Время изменения страницы, вычисленное декоратором conditional."""
+    return getattr(request, '_page_changed_at', None) or None
+
+
+def remember_stamp(view):
+    """Сохраняет в ответе отметку, с которой он отрисован.
+
+    Ставится под cache_page_shared: ответ из кеша страниц сообщает
+    conditional, к какой отметке относится его содержимое.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        response.page_stamp = page_stamp(request)
+        return response
+    return wrapper
+
+
+def validators(request, stamp):
+    """ETag и Last-Modified (timestamp) страницы с отметкой stamp.
+
+    Страница различается для каждого пользователя, поэтому его id входит
+    в ETag, а Last-Modified отдается только анонимам.
+    """
+    if stamp is None:
+        return None, None
+    etag = quote_etag('{}-{}-{}'.format(
+        settings.ETAG_VERSION, request.user.pk or 0, stamp.timestamp()
+    ))
+    if request.user.is_authenticated:
+        return etag, None
+    return etag, timegm(stamp.utctimetuple())
+
+
+def conditional(scopes):
+    """Декоратор: условный GET по времени изменения областей страницы."""
+    def page_changed_at(request, *args, **kwargs):
+        names = scopes(request, *args, **kwargs)
+        stamp = names and changed_at(names)
+        updated_at = getattr(page_object(request), 'updated_at', None)
+        if stamp and updated_at and updated_at > stamp:
+            stamp = updated_at
+        return stamp if stamp and settled(stamp) else None
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            stamp = request._page_changed_at = page_changed_at(
+                request, *args, **kwargs
+            )
+            etag, last_modified = validators(request, stamp)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                etag, last_modified = validators(
+                    request, getattr(response, 'page_stamp', stamp)
+                )
+            if request.method in ('GET', 'HEAD'):
+                if last_modified:
+                    response['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
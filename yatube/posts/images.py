@@ -0,0 +1,90 @@
+"""Ограничение и сжатие загружаемых картинок постов.
+
+Размер в байтах проверяется еще при приеме потока (см. uploads),
+число пикселей — по заголовку файла до полного декодирования.
+Слишком большие картинки и картинки с метаданными пережимаются
+в отдельном процессе, чтобы пик памяти не доставался воркеру.
+"""
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def inspect(upload):
+    """Читает только заголовок: (ширина, высота, нужно ли пережимать).
+
+    Анимированные картинки не пережимаются.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        width, height = image.size
+        needs_optimizing = not getattr(image, 'is_animated', False) and (
+            max(width, height) > settings.POST_IMAGE_MAX_DIMENSION
+            or upload.size > settings.POST_IMAGE_REENCODE_BYTES
+            or 'exif' in image.info
+        )
+    upload.seek(0)
+    return width, height, needs_optimizing
+
+
+def optimize(source, max_dimension, quality):
+    """Уменьшает картинку, убирает метаданные и кодирует для веба.
+
+    Выполняется в процессе-воркере: source — путь к файлу или байты.
+    Возвращает (байты, расширение, content_type).
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with Image.open(source) as image:
+        image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        output = io.BytesIO()
+        if has_alpha(image):
+            image.convert('RGBA').save(output, 'PNG', optimize=True)
+            return output.getvalue(), 'png', 'image/png'
+        image.convert('RGB').save(
+            output, 'JPEG', quality=quality, optimize=True, progressive=True
+        )
+        return output.getvalue(), 'jpg', 'image/jpeg'
+
+
+def optimize_upload(upload):
+    """Пережатая копия загруженного файла."""
+    if hasattr(upload, 'temporary_file_path'):
+        source = upload.temporary_file_path()
+    else:
+        upload.seek(0)
+        source = upload.read()
+    arguments = (
+        source,
+        settings.POST_IMAGE_MAX_DIMENSION,
+        settings.POST_IMAGE_QUALITY,
+    )
+    if settings.IMAGE_WORKERS:
+        content, extension, content_type = executor().submit(
+            optimize, *arguments
+        ).result()
+    else:
+        content, extension, content_type = optimize(*arguments)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return SimpleUploadedFile(f'{stem}.{extension}', content, content_type)
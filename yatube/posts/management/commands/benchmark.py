@@ -0,0 +1,212 @@
+import json
+import math
+import random
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+WRITER_COMMENT = 'benchmark: фоновая запись'
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает страницы posts.urls параллельными запросами и выводит '
+        'задержки p50/p95/p99, запросы к БД на страницу и RPS в JSON. '
+        'С --writers параллельно идут записи комментариев: так видно, '
+        'как запись блокирует чтение (сравните SQLITE_TUNING=0 и 1).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--writers', type=int, default=0,
+            help='Потоков, пишущих комментарии во время замеров.'
+        )
+        parser.add_argument('--output', default=None)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--clear-cache', action='store_true',
+            help='Очищать кеш перед каждой страницей.'
+        )
+        parser.add_argument(
+            '--fill', action='store_true',
+            help='Сначала вызвать fill_database; размеры задаются ниже.'
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        if options['fill']:
+            call_command(
+                'fill_database',
+                users=options['users'],
+                posts=options['posts'],
+                follows=options['follows'],
+                comments=options['comments'],
+                seed=options['seed'],
+                stdout=self.stdout,
+            )
+        self.random = random.Random(options['seed'])
+        reader = User.objects.annotate(
+            subscriptions=Count('follower')
+        ).order_by('-subscriptions').first()
+        if reader is None or not Post.objects.exists():
+            raise CommandError('База пуста: запустите с --fill.')
+        results = {}
+        for name, urls, login in self.targets(options['requests'], reader):
+            if options['clear_cache']:
+                cache.clear()
+            results[name] = self.run(
+                urls, reader if login else None, options['concurrency'],
+                options['writers']
+            )
+            self.report(name, results[name])
+        Comment.objects.filter(text=WRITER_COMMENT).delete()
+        payload = json.dumps(
+            {'options': options, 'results': results},
+            ensure_ascii=False, indent=2, default=str
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(payload)
+        else:
+            self.stdout.write(payload)
+
+    def sample(self, queryset, field, amount):
+        values = list(queryset.values_list(field, flat=True)[:1000])
+        return [self.random.choice(values) for _ in range(amount)]
+
+    def targets(self, amount, reader):
+        pages = [self.random.randint(1, 20) for _ in range(amount)]
+        yield 'posts:main_page', [
+            f'{reverse("posts:main_page")}?page={page}' for page in pages
+        ], False
+        yield 'posts:group_list', [
+            reverse('posts:group_list', args=(slug,))
+            for slug in self.sample(Group.objects.all(), 'slug', amount)
+        ], False
+        yield 'posts:profile', [
+            reverse('posts:profile', args=(username,))
+            for username in self.sample(
+                User.objects.filter(posts__isnull=False), 'username', amount
+            )
+        ], False
+        yield 'posts:post_detail', [
+            reverse('posts:post_detail', args=(pk,))
+            for pk in self.sample(Post.objects.all(), 'pk', amount)
+        ], False
+        yield 'posts:follow_index', [
+            f'{reverse("posts:follow_index")}?page={page}' for page in pages
+        ], True
+
+    def fetch(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            try:
+                status = client.get(url).status_code
+            except OperationalError:
+                # "database is locked": читатель не дождался писателя.
+                status = 503
+            elapsed = time.perf_counter() - started
+        return elapsed, len(queries), status
+
+    def worker(self, user, urls):
+        """Поток со своим клиентом и своим соединением с БД."""
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        try:
+            return [self.fetch(client, url) for url in urls]
+        finally:
+            connection.close()
+
+    def writer(self, stop, seed):
+        """Пишет комментарии, пока идут замеры; возвращает (записи, ошибки)."""
+        generator = random.Random(seed)
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+        user_ids = list(User.objects.values_list('pk', flat=True)[:1000])
+        writes = errors = 0
+        try:
+            while not stop.is_set():
+                try:
+                    Comment.objects.create(
+                        post_id=generator.choice(post_ids),
+                        author_id=generator.choice(user_ids),
+                        text=WRITER_COMMENT,
+                    )
+                    writes += 1
+                except OperationalError:
+                    errors += 1
+            return writes, errors
+        finally:
+            connection.close()
+
+    def run(self, urls, user, concurrency, writers=0):
+        chunks = [urls[number::concurrency] for number in range(concurrency)]
+        stop = threading.Event()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers or 1) as writer_pool:
+            writes = [
+                writer_pool.submit(self.writer, stop, self.random.random())
+                for _ in range(writers)
+            ]
+            try:
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    measurements = [
+                        measurement
+                        for chunk in executor.map(
+                            self.worker, [user] * concurrency, chunks
+                        )
+                        for measurement in chunk
+                    ]
+                wall_time = time.perf_counter() - started
+            finally:
+                stop.set()
+            writes = [future.result() for future in writes]
+        latencies = [elapsed * 1000 for elapsed, _, _ in measurements]
+        queries = [count for _, count, _ in measurements]
+        return {
+            'requests': len(urls),
+            'errors': sum(status >= 400 for _, _, status in measurements),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'queries_per_request': sum(queries) / len(queries),
+            'max_queries': max(queries),
+            'rps': len(urls) / wall_time,
+            'writes_per_second': sum(done for done, _ in writes) / wall_time,
+            'write_errors': sum(failed for _, failed in writes),
+        }
+
+    def report(self, name, result):
+        self.stderr.write(
+            f'{name:<20} p50={result["p50_ms"]:.1f}ms '
+            f'p95={result["p95_ms"]:.1f}ms p99={result["p99_ms"]:.1f}ms '
+            f'queries={result["queries_per_request"]:.1f} '
+            f'rps={result["rps"]:.1f} errors={result["errors"]} '
+            f'writes/s={result["writes_per_second"]:.1f} '
+            f'write_errors={result["write_errors"]}'
+        )
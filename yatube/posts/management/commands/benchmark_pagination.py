@@ -0,0 +1,54 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Page
+from django.template.loader import render_to_string
+
+from posts.models import Post
+from posts.utils import CountedPaginator
+
+TEMPLATE = 'posts/includes/paginator.html'
+
+
+class Command(BaseCommand):
+    help = (
+        'Отрисовывает posts/includes/paginator.html для лент с разным '
+        'числом страниц и выводит время отрисовки и размер HTML в JSON: '
+        'с окном номеров страниц они не растут вместе с лентой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, nargs='+',
+            default=[10, 1000, 100000, 1000000],
+        )
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        posts = list(Post.objects.all()[:settings.LIMITED])
+        if not posts:
+            raise CommandError('База пуста: запустите fill_database.')
+        results = {}
+        for pages in options['pages']:
+            # Страница из середины ленты: окно с обеих сторон.
+            paginator = CountedPaginator(
+                Post.objects.none(), settings.LIMITED,
+                pages * settings.LIMITED
+            )
+            page = Page(posts, max(pages // 2, 1), paginator)
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                html = render_to_string(TEMPLATE, {'page_obj': page})
+            elapsed = time.perf_counter() - started
+            results[pages] = {
+                'render_ms': elapsed / options['repeat'] * 1000,
+                'bytes': len(html.encode()),
+                'links': html.count('class="page-link"'),
+            }
+            self.stderr.write(
+                f'{pages} стр.: {results[pages]["render_ms"]:.3f} мс, '
+                f'{results[pages]["bytes"]} байт'
+            )
+        self.stdout.write(json.dumps(results, indent=2))
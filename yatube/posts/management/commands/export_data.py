@@ -0,0 +1,44 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.bulk import FORMATS, TABLES, data_path, export_table
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в каталог: '
+        'по файлу JSONL или CSV на таблицу, пачками по id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(TABLES), default=list(TABLES)
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную выгрузку с сохраненной позиции.'
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options['directory'], exist_ok=True)
+        for table in TABLES:
+            if table not in options['tables']:
+                continue
+            started = time.monotonic()
+            written = export_table(
+                table,
+                data_path(options['directory'], table, options['format']),
+                options['format'],
+                options['chunk_size'],
+                resume=options['resume'],
+            )
+            self.stdout.write(
+                f'{table}: {written} строк за '
+                f'{time.monotonic() - started:.1f} с'
+            )
+        self.stdout.write(self.style.SUCCESS('Выгрузка завершена.'))
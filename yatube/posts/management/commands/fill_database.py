@@ -0,0 +1,147 @@
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from faker import Faker
+
+from posts.bulk import automatic_dates, explicit_dates, rebuild_derived
+from posts.models import Comment, Follow, Group, Post, User
+
+TEXT_POOL_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, постами и подписками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='По умолчанию размер пачки выбирает бэкенд БД.'
+        )
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        self.since = timezone.now() - timedelta(days=options['days'])
+        self.texts = [
+            self.faker.paragraph(nb_sentences=5)
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        users = self.create_users(options['users'])
+        groups = self.create_groups(options['groups'])
+        posts = self.create_posts(options['posts'], users, groups)
+        self.create_follows(options['follows'], users)
+        self.create_comments(options['comments'], users, posts)
+        self.stdout.write('Пересчет счетчиков, лент и поискового индекса...')
+        rebuild_derived()
+        self.stdout.write(self.style.SUCCESS('База заполнена.'))
+
+    def ids(self, model):
+        return list(model.objects.values_list('pk', flat=True))
+
+    def random_date(self):
+        return self.since + timedelta(
+            seconds=self.random.randint(
+                0, int((timezone.now() - self.since).total_seconds())
+            )
+        )
+
+    def bulk(self, model, objects):
+        """Пишет объекты пачками: bulk_create сам собрал бы весь список."""
+        objects = iter(objects)
+        chunk_size = self.batch_size or settings.TIMELINE_BATCH_SIZE
+        while True:
+            chunk = list(islice(objects, chunk_size))
+            if not chunk:
+                return
+            model.objects.bulk_create(
+                chunk, batch_size=self.batch_size, ignore_conflicts=True
+            )
+
+    def create_users(self, amount):
+        self.stdout.write(f'Пользователи: {amount}')
+        password = make_password(None)
+        start = User.objects.count()
+        self.bulk(User, (
+            User(
+                username=f'{self.faker.user_name()}_{number}',
+                first_name=self.faker.first_name(),
+                last_name=self.faker.last_name(),
+                password=password,
+            )
+            for number in range(start, start + amount)
+        ))
+        return self.ids(User)
+
+    def create_groups(self, amount):
+        self.stdout.write(f'Группы: {amount}')
+        start = Group.objects.count()
+        self.bulk(Group, (
+            Group(
+                title=self.faker.catch_phrase()[:200],
+                slug=f'group-{number}',
+                description=self.faker.paragraph(),
+            )
+            for number in range(start, start + amount)
+        ))
+        return self.ids(Group)
+
+    def create_posts(self, amount, users, groups):
+        self.stdout.write(f'Посты: {amount}')
+        with explicit_dates(*automatic_dates(Post)):
+            self.bulk(Post, (
+                Post(
+                    text=self.random.choice(self.texts),
+                    author_id=self.random.choice(users),
+                    group_id=(
+                        self.random.choice(groups)
+                        if groups and self.random.random() < 0.7
+                        else None
+                    ),
+                    pub_date=pub_date,
+                    updated_at=pub_date,
+                )
+                for pub_date in (self.random_date() for _ in range(amount))
+            ))
+        return self.ids(Post)
+
+    def create_follows(self, amount, users):
+        self.stdout.write(f'Подписки: {amount}')
+        self.bulk(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in (
+                (self.random.choice(users), self.random.choice(users))
+                for _ in range(amount)
+            )
+            if user_id != author_id
+        ))
+
+    def create_comments(self, amount, users, posts):
+        self.stdout.write(f'Комментарии: {amount}')
+        if not posts:
+            return
+        with explicit_dates(Comment._meta.get_field('created')):
+            self.bulk(Comment, (
+                Comment(
+                    post_id=self.random.choice(posts),
+                    author_id=self.random.choice(users),
+                    text=self.faker.sentence(),
+                    created=self.random_date(),
+                )
+                for _ in range(amount)
+            ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для постов с картинкой, у которых их еще нет.'
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(image='').filter(
+            thumbnail_url=''
+        ).values_list('pk', flat=True)
+        for post_id in post_ids.iterator():
+            generate(post_id)
+        self.stdout.write(self.style.SUCCESS('Миниатюры построены.'))
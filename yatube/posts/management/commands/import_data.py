@@ -0,0 +1,67 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.bulk import (
+    FORMATS, TABLES, data_path, import_table, rebuild_derived
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из каталога, '
+        'созданного export_data. Пользователи с нужными id должны уже '
+        'существовать; картинки постов переносятся отдельно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(TABLES), default=list(TABLES)
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Размер INSERT внутри пачки; по умолчанию выбирает бэкенд.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Потоков записи; SQLite все равно пишет по одному.'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную загрузку с сохраненной позиции.'
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счетчики, ленты и поисковый индекс.'
+        )
+
+    def handle(self, *args, **options):
+        for table in TABLES:
+            if table not in options['tables']:
+                continue
+            path = data_path(
+                options['directory'], table, options['format']
+            )
+            if not os.path.exists(path):
+                raise CommandError(f'Нет файла {path}')
+            started = time.monotonic()
+            imported = import_table(
+                table, path, options['format'], options['chunk_size'],
+                resume=options['resume'],
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(
+                f'{table}: {imported} строк за '
+                f'{time.monotonic() - started:.1f} с'
+            )
+        if not options['skip_rebuild']:
+            self.stdout.write(
+                'Пересчет счетчиков, лент и поискового индекса...'
+            )
+            rebuild_derived()
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена.'))
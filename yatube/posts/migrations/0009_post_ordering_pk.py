@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-17 11:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_auto_20220806_1707'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ['-pub_date', '-pk'], 'verbose_name': 'Пост', 'verbose_name_plural': 'Посты'},
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-17 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date', '-id'], name='post_pub_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('thumbnail_url', ''), models.Q(_negated=True, image='')), fields=['id'], name='post_pending_thumbnail_idx'),
+        ),
+    ]
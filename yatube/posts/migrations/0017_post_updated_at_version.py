@@ -0,0 +1,55 @@
+from django.db import migrations, models, transaction
+from django.db.models import F
+
+BATCH_SIZE = 2000
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Проставляет updated_at = pub_date пачками по id.
+
+    Каждая пачка — отдельная короткая транзакция, поэтому на большой
+    таблице не держится долгая блокировка и не растет журнал.
+    """
+    Post = apps.get_model('posts', 'Post')
+    alias = schema_editor.connection.alias
+    posts = Post.objects.using(alias)
+    last_pk = 0
+    while True:
+        ids = list(
+            posts.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            return
+        with transaction.atomic(using=alias):
+            posts.filter(
+                pk__gte=ids[0], pk__lte=ids[-1], updated_at__isnull=True
+            ).update(updated_at=F('pub_date'))
+        last_pk = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('posts', '0016_list_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
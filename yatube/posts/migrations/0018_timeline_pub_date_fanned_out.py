@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 2000
+
+
+def mark_held_posts(apps, schema_editor):
+    """Посты популярных авторов не были разосланы по лентам."""
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    alias = schema_editor.connection.alias
+    Post.objects.using(alias).filter(
+        author_id__in=UserStats.objects.using(alias).filter(
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values('user_id')
+    ).update(fanned_out=False)
+
+
+def backfill_pub_date(apps, schema_editor):
+    """Копирует pub_date поста в записи ленты пачками по id."""
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    alias = schema_editor.connection.alias
+    entries = TimelineEntry.objects.using(alias)
+    pub_date = Subquery(
+        Post.objects.using(alias).filter(
+            pk=OuterRef('post_id')
+        ).values('pub_date')[:1]
+    )
+    last_pk = 0
+    while True:
+        ids = list(
+            entries.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            return
+        with transaction.atomic(using=alias):
+            entries.filter(
+                pk__gte=ids[0], pk__lte=ids[-1], pub_date__isnull=True
+            ).update(pub_date=pub_date)
+        last_pk = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('posts', '0017_post_updated_at_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(mark_held_posts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(fanned_out=False), fields=['author'], name='post_held_author_idx'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='pub_date',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_pub_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='timelineentry',
+            name='pub_date',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='timeline_user_pub_date_idx'),
+        ),
+    ]
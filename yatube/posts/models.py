@@ -1,26 +1,50 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.utils import timezone
 
 User = get_user_model()
 
 
-class Post(models.Model):
+class AtomicSaveModel(models.Model):
+    """Сохранение и обработчики post_save выполняются в одной транзакции.
+
+    Так счетчики, которые меняют сигналы, не расходятся с данными при
+    ошибке. Удаление уже атомарно: Collector шлет post_delete внутри
+    своей транзакции.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class Post(AtomicSaveModel):
     """Создает пост."""
 
     text = models.TextField(
         help_text={'create': 'Напишите', 'edit': 'Редактируйте'}
     )
-    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='posts')
+        related_name='posts',
+        db_index=False)
     group = models.ForeignKey(
         'Group',
         blank=True,
         null=True,
         on_delete=models.SET_NULL,
+        db_index=False,
         related_name='posts',
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост')
@@ -29,15 +53,74 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnail_url = models.CharField(
+        max_length=255, blank=True, editable=False
+    )
+    thumbnail_width = models.PositiveSmallIntegerField(
+        null=True, editable=False
+    )
+    thumbnail_height = models.PositiveSmallIntegerField(
+        null=True, editable=False
+    )
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # False — автор был популярным при публикации, и пост не разослан
+    # по лентам подписчиков, а подмешивается при чтении.
+    fanned_out = models.BooleanField(default=True, editable=False)
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-pk']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['id'],
+                name='post_pending_thumbnail_idx',
+                condition=models.Q(thumbnail_url='') & ~models.Q(image=''),
+            ),
+            models.Index(
+                fields=['author'],
+                name='post_held_author_idx',
+                condition=models.Q(fanned_out=False),
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:settings.POST_LIMITER]
 
+    def save(self, *args, **kwargs):
+        """Каждое сохранение существующего поста увеличивает version.
+
+        Увеличение выполняет сама БД, поэтому оно не теряется при
+        параллельном update(**edit_marks()).
+        """
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        self.version = models.F('version') + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields, 'version', 'updated_at'
+            }
+        super().save(*args, **kwargs)
+        self.refresh_from_db(using=self._state.db, fields=['version'])
+
+    @staticmethod
+    def edit_marks():
+        """Поля для QuerySet.update, меняющего отображение поста."""
+        return {'version': models.F('version') + 1,
+                'updated_at': timezone.now()}
+
 
 class Group(models.Model):
     """Создает группу."""
@@ -45,17 +128,19 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
 
-class Comment(models.Model):
+class Comment(AtomicSaveModel):
     """Создает комментарий."""
     post = models.ForeignKey(
         Post,
         related_name='comments',
         on_delete=models.CASCADE,
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -67,12 +152,18 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
         def __str__(self):
             return self.text
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     """Добавляем возможность подписки на авторов."""
     user = models.ForeignKey(
         User,
@@ -82,7 +173,8 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User,
         related_name='following',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
 
     class Meta:
@@ -92,3 +184,59 @@ class Follow(models.Model):
                 name="unique_followers"
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост, разосланный подписчику."""
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Денормализованные счетчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
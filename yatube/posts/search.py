@@ -0,0 +1,181 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд выбирается по СУБД (или настройкой SEARCH_BACKEND):
+SQLite — таблица FTS5 со стеммингом на Python, PostgreSQL — tsvector
+с конфигурацией russian, остальные — поиск через icontains.
+Индекс обновляется сигналами сохранения и удаления Post.
+"""
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .stemmer import stem_text
+
+SQLITE_TABLE = 'posts_search'
+
+
+class SearchResults:
+    """Ленивая выдача, понятная Paginator: count() и срезы."""
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        return self.backend.fetch(self.query, start, item.stop - start)
+
+
+class BaseSearchBackend:
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        """Переиндексирует все посты (после массовой загрузки)."""
+
+    def count(self, query):
+        raise NotImplementedError
+
+    def ranked_ids(self, query, offset, limit):
+        raise NotImplementedError
+
+    def fetch(self, query, offset, limit):
+        """Посты в порядке релевантности."""
+        ids = self.ranked_ids(query, offset, limit)
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def search(self, query):
+        return SearchResults(self, query)
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5: в индексе хранятся основы слов, ранжирование — bm25."""
+
+    def match(self, query):
+        return ' '.join(
+            '"{}"'.format(term.replace('"', '""'))
+            for term in stem_text(query)
+        )
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, ' '.join(stem_text(post.text))]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        rows = (
+            (pk, ' '.join(stem_text(text)))
+            for pk, text in Post.objects.values_list('pk', 'text').iterator()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+            cursor.executemany(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, text) VALUES (%s, %s)',
+                rows
+            )
+
+    def count(self, query):
+        match = self.match(query)
+        if not match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {SQLITE_TABLE} '
+                f'WHERE {SQLITE_TABLE} MATCH %s', [match]
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, offset, limit):
+        match = self.match(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SQLITE_TABLE} '
+                f'WHERE {SQLITE_TABLE} MATCH %s '
+                'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                [match, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector по выражению; индекс GIN создает миграция."""
+
+    config = 'russian'
+
+    def queryset(self, query):
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector
+        )
+        vector = SearchVector('text', config=self.config)
+        search_query = SearchQuery(query, config=self.config)
+        return Post.objects.annotate(
+            search=vector, rank=SearchRank(vector, search_query)
+        ).filter(search=search_query)
+
+    def count(self, query):
+        return self.queryset(query).count()
+
+    def ranked_ids(self, query, offset, limit):
+        return list(
+            self.queryset(query)
+            .order_by('-rank', '-pk')
+            .values_list('pk', flat=True)[offset:offset + limit]
+        )
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Запасной вариант для прочих СУБД: без ранжирования."""
+
+    def queryset(self, query):
+        return Post.objects.filter(text__icontains=query)
+
+    def count(self, query):
+        return self.queryset(query).count()
+
+    def ranked_ids(self, query, offset, limit):
+        return list(
+            self.queryset(query)
+            .values_list('pk', flat=True)[offset:offset + limit]
+        )
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend():
+    backend_path = getattr(settings, 'SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    return VENDOR_BACKENDS.get(connection.vendor, LikeSearchBackend)()
@@ -0,0 +1,240 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, freshness, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    """Заводит счетчики новому пользователю."""
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_name(sender, instance, raw=False, update_fields=None,
+                       **kwargs):
+    """Запоминает имя пользователя до сохранения."""
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(NAME_FIELDS):
+        return
+    instance._previous_name = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def touch_renamed_author_pages(sender, instance, raw=False, **kwargs):
+    """Имя автора хранится в кешированных списках и лентах."""
+    previous = getattr(instance, '_previous_name', None)
+    if raw or previous is None:
+        return
+    if previous != tuple(getattr(instance, name) for name in NAME_FIELDS):
+        freshness.touch_author(instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, raw=False, **kwargs):
+    """Запоминает автора, группу и картинку поста до редактирования."""
+    if raw:
+        return
+    if instance._state.adding:
+        timeline.decide_fan_out(instance)
+    previous = Post.objects.filter(pk=instance.pk).values(
+        'author_id', 'group_id', 'image'
+    ).first() if instance.pk else None
+    if previous is not None:
+        instance._previous_author_id = previous['author_id']
+        instance._previous_group_id = previous['group_id']
+    previous_image = previous['image'] if previous else ''
+    instance._image_changed = instance.image.name != previous_image
+    if instance._image_changed:
+        instance.thumbnail_url = ''
+        instance.thumbnail_width = instance.thumbnail_height = None
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    """Обновляет счетчики постов автора и групп.
+
+    Выполняется в транзакции сохранения поста (AtomicSaveModel).
+    """
+    if raw:
+        return
+    if created:
+        counters.increment(
+            UserStats.objects.filter(user_id=instance.author_id),
+            'posts_count'
+        )
+        counters.increment(
+            Group.objects.filter(pk=instance.group_id), 'posts_count'
+        )
+        transaction.on_commit(counters.reset_posts_total)
+        return
+    previous_author_id = getattr(instance, '_previous_author_id', None)
+    if previous_author_id != instance.author_id:
+        counters.increment(
+            UserStats.objects.filter(
+                user_id=previous_author_id, posts_count__gt=0
+            ),
+            'posts_count', -1
+        )
+        counters.increment(
+            UserStats.objects.filter(user_id=instance.author_id),
+            'posts_count'
+        )
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        counters.increment(
+            Group.objects.filter(pk=previous_group_id, posts_count__gt=0),
+            'posts_count', -1
+        )
+        counters.increment(
+            Group.objects.filter(pk=instance.group_id), 'posts_count'
+        )
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.increment(
+        UserStats.objects.filter(
+            user_id=instance.author_id, posts_count__gt=0
+        ),
+        'posts_count', -1
+    )
+    counters.increment(
+        Group.objects.filter(pk=instance.group_id, posts_count__gt=0),
+        'posts_count', -1
+    )
+    transaction.on_commit(counters.reset_posts_total)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post_pages(sender, instance, raw=False, **kwargs):
+    """Меняет валидаторы страниц, на которых виден пост."""
+    if not raw:
+        freshness.touch_post(
+            instance, getattr(instance, '_previous_group_id', None)
+        )
+
+
+@receiver(post_save, sender=Group)
+def touch_group_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        freshness.touch(
+            freshness.ALL_POSTS, freshness.group_scope(instance.pk)
+        )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    """Обновляет пост в поисковом индексе."""
+    if not raw:
+        search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnail(sender, instance, raw=False, **kwargs):
+    """Заказывает миниатюру для новой или замененной картинки."""
+    if not raw and instance.image and getattr(
+        instance, '_image_changed', False
+    ):
+        thumbnails.schedule(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    """Рассылает новый пост по лентам подписчиков."""
+    if created and not raw:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_post(sender, instance, raw=False, **kwargs):
+    """comments_count поста виден и в списках постов API."""
+    if raw:
+        return
+    try:
+        post = instance.post
+    except Post.DoesNotExist:
+        freshness.touch(freshness.post_scope(instance.post_id))
+    else:
+        freshness.touch_comments(post)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_followed_profile(sender, instance, raw=False, **kwargs):
+    """Кнопка подписки и счетчики видны на странице автора."""
+    if not raw:
+        freshness.touch(freshness.author_scope(instance.author_id))
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment(
+            Post.objects.filter(pk=instance.post_id), 'comments_count'
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.increment(
+        Post.objects.filter(pk=instance.post_id, comments_count__gt=0),
+        'comments_count', -1
+    )
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment(
+            UserStats.objects.filter(user_id=instance.author_id),
+            'followers_count'
+        )
+        counters.increment(
+            UserStats.objects.filter(user_id=instance.user_id),
+            'following_count'
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.increment(
+        UserStats.objects.filter(
+            user_id=instance.author_id, followers_count__gt=0
+        ),
+        'followers_count', -1
+    )
+    counters.increment(
+        UserStats.objects.filter(
+            user_id=instance.user_id, following_count__gt=0
+        ),
+        'following_count', -1
+    )
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    """Добавляет в ленту посты автора, на которого подписались."""
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    """Убирает из ленты посты автора, от которого отписались."""
+    timeline.prune(instance.user_id, instance.author_id)
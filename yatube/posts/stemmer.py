@@ -0,0 +1,141 @@
+"""Стеммер Портера (Snowball) для русского языка.
+
+Нужен полнотекстовому поиску на SQLite: FTS5 не умеет стемминг
+русского, поэтому в индекс и в запрос попадают уже основы слов.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+ADJECTIVE = ((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = ((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+WORD_RE = re.compile(r'\w+')
+
+
+def _region(word, start):
+    """Начало области после первой согласной, идущей за гласной."""
+    for position in range(start + 1, len(word)):
+        if word[position] not in VOWELS and word[position - 1] in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def _remove(word, groups):
+    """Убирает самое длинное окончание из групп.
+
+    Окончания первой группы убираются, только если перед ними «а» или «я».
+    Возвращает (слово, удалось ли убрать).
+    """
+    conditional, plain = groups
+    found = max(
+        (ending for ending in conditional + plain if word.endswith(ending)),
+        key=len,
+        default=None,
+    )
+    if found is None:
+        return word, False
+    stem = word[:-len(found)]
+    if found in plain:
+        return stem, True
+    if stem.endswith(('а', 'я')):
+        return stem, True
+    return word, False
+
+
+def _remove_adjectival(word):
+    word, removed = _remove(word, ADJECTIVE)
+    if removed:
+        word = _remove(word, PARTICIPLE)[0]
+    return word, removed
+
+
+def _rv_start(word):
+    """Начало RV: позиция после первой гласной."""
+    return next(
+        (position + 1 for position, letter in enumerate(word)
+         if letter in VOWELS),
+        len(word),
+    )
+
+
+def _remove_inflection(rv):
+    """Шаг 1: деепричастие, иначе возвратность и основное окончание."""
+    rv, removed = _remove(rv, PERFECTIVE_GERUND)
+    if removed:
+        return rv
+    rv = _remove(rv, REFLEXIVE)[0]
+    rv, removed = _remove_adjectival(rv)
+    if not removed:
+        rv, removed = _remove(rv, VERB)
+    if not removed:
+        rv = _remove(rv, NOUN)[0]
+    return rv
+
+
+def _remove_derivational(rv, r2_start):
+    """Шаг 3: суффикс «ость», если он целиком в R2 (r2_start — от RV)."""
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(rv) - len(ending) >= r2_start:
+            return rv[:-len(ending)]
+    return rv
+
+
+def _remove_superlative(rv):
+    """Шаг 4: «нн», превосходная степень или мягкий знак."""
+    if rv.endswith('нн'):
+        return rv[:-1]
+    for ending in SUPERLATIVE:
+        if rv.endswith(ending):
+            rv = rv[:-len(ending)]
+            return rv[:-1] if rv.endswith('нн') else rv
+    if rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv_start = _rv_start(word)
+    r2_start = _region(word, _region(word, 0) - 1)
+    prefix, rv = word[:rv_start], word[rv_start:]
+    rv = _remove_inflection(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    rv = _remove_derivational(rv, r2_start - rv_start)
+    return prefix + _remove_superlative(rv)
+
+
+def stem_text(text):
+    """Токены текста, приведенные к основам."""
+    return [stem(token) for token in WORD_RE.findall(text.lower())]
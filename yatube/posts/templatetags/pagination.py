@@ -0,0 +1,35 @@
+from django import template
+
+from posts.utils import (
+    CURSOR_NEXT, CURSOR_PREVIOUS, encode_cursor, page_window as window
+)
+
+register = template.Library()
+
+
+@register.filter
+def next_cursor(page):
+    """Курсор на страницу после переданной (в том числе offset-страницы)."""
+    if not page.has_next():
+        return ''
+    return encode_cursor(page[len(page) - 1], CURSOR_NEXT)
+
+
+@register.filter
+def previous_cursor(page):
+    """Курсор на страницу перед переданной."""
+    if not page.has_previous():
+        return ''
+    return encode_cursor(page[0], CURSOR_PREVIOUS)
+
+
+@register.simple_tag
+def last_cursor():
+    """Курсор на последнюю страницу ленты."""
+    return encode_cursor(None, CURSOR_PREVIOUS)
+
+
+@register.filter
+def page_window(page):
+    """Окно номеров страниц вместо полного page_range."""
+    return window(page.number, page.paginator.num_pages)
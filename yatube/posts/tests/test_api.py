@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+            for number in range(settings.LIMITED + 3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pagination(self):
+        """Курсор листает ленту без пропусков и повторов."""
+        seen = []
+        url = reverse('api_v1:posts')
+        params = {'limit': 5, 'fields': 'id'}
+        while True:
+            data = self.client.get(url, params).json()
+            seen.extend(post['id'] for post in data['results'])
+            if data['next'] is None:
+                break
+            params['cursor'] = data['next']
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только запрошенные поля."""
+        response = self.client.get(
+            reverse('api_v1:posts'), {'fields': 'id,author', 'limit': 1}
+        )
+        self.assertEqual(
+            response.json()['results'],
+            [{'id': self.posts[-1].pk, 'author': 'author'}]
+        )
+        response = self.client.get(
+            reverse('api_v1:posts'), {'fields': 'id,secret'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_group_and_profile(self):
+        data = self.client.get(
+            reverse('api_v1:group', args=(self.group.slug,))
+        ).json()
+        self.assertEqual(data['group']['posts_count'], len(self.posts))
+        self.assertEqual(len(data['posts']['results']), settings.LIMITED)
+        self.assertEqual(data['posts']['results'][0]['group'], 'group')
+        data = self.client.get(
+            reverse('api_v1:profile', args=(self.author.username,))
+        ).json()
+        self.assertEqual(data['profile']['followers_count'], 1)
+        response = self.client.get(reverse('api_v1:group', args=('none',)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_detail_with_comments(self):
+        post = self.posts[0]
+        data = self.client.get(
+            reverse('api_v1:post_detail', args=(post.pk,))
+        ).json()
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['comments'][0]['author'], 'reader')
+
+    def test_cached_response_invalidated_on_edit(self):
+        """Повторный запрос отдается из кеша, правка дает новые данные."""
+        address = reverse('api_v1:group', args=(self.group.slug,))
+        self.client.get(address)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(address)
+        self.assertEqual(len(context), 1)
+        post = Post.objects.get(pk=self.posts[-1].pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        data = self.client.get(address).json()
+        self.assertEqual(
+            data['posts']['results'][0]['text'], 'Исправленный пост'
+        )
+
+    def test_cached_lists_follow_comments_and_renames(self):
+        """Списки из кеша видят новые комментарии и имя автора."""
+        addresses = (
+            reverse('api_v1:posts'),
+            reverse('api_v1:group', args=(self.group.slug,)),
+            reverse('api_v1:profile', args=(self.author.username,)),
+        )
+        etags = [self.client.get(address)['ETag'] for address in addresses]
+        post = Post.objects.get(pk=self.posts[-1].pk)
+        Comment.objects.create(post=post, author=self.reader, text='Еще')
+        for address, etag in zip(addresses, etags):
+            with self.subTest(address=address):
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                data = response.json()
+                results = data.get('results') or data['posts']['results']
+                self.assertEqual(results[0]['comments_count'], 1)
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'renamed'
+        author.save()
+        for address in addresses[:2]:
+            with self.subTest(address=address):
+                data = self.client.get(address).json()
+                results = data.get('results') or data['posts']['results']
+                self.assertEqual(results[0]['author'], 'renamed')
+        data = self.client.get(
+            reverse('api_v1:profile', args=('renamed',))
+        ).json()
+        self.assertEqual(data['posts']['results'][0]['comments_count'], 1)
+
+    def test_follow_feed(self):
+        response = self.client.get(reverse('api_v1:follow'))
+        self.assertEqual(response.status_code, 401)
+        self.client.force_login(self.reader)
+        data = self.client.get(reverse('api_v1:follow')).json()
+        self.assertEqual(len(data['results']), settings.LIMITED)
+        self.assertIsNotNone(data['next'])
@@ -0,0 +1,239 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import timeline
+from ..bulk import data_path, save_chunk, write_checkpoint
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserStats
+
+
+class FillDatabaseCommandTest(TestCase):
+    def test_fill_database_creates_consistent_data(self):
+        """fill_database создает данные и сразу пересчитывает счетчики."""
+        call_command(
+            'fill_database', users=20, groups=3, posts=100, follows=40,
+            comments=50, seed=1, stdout=StringIO()
+        )
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertEqual(UserStats.objects.count(), 20)
+        self.assertEqual(
+            sum(UserStats.objects.values_list('posts_count', flat=True)), 100
+        )
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=follow.user, author=follow.author
+            ).count(),
+            Post.objects.filter(author=follow.author).count()
+        )
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1
+        )
+
+    def test_fill_database_writes_in_chunks(self):
+        """Объекты передаются в bulk_create пачками, а не одним списком."""
+        bulk_create = QuerySet.bulk_create
+        sizes = []
+
+        def record(queryset, objs, *args, **kwargs):
+            if queryset.model is Post:
+                sizes.append(len(objs))
+            return bulk_create(queryset, objs, *args, **kwargs)
+        with mock.patch.object(QuerySet, 'bulk_create', record):
+            call_command(
+                'fill_database', users=5, groups=1, posts=25, follows=0,
+                comments=0, batch_size=10, seed=1, stdout=StringIO()
+            )
+        self.assertEqual(Post.objects.count(), 25)
+        self.assertEqual(sizes, [10, 10, 5])
+
+
+class TimelineRebuildTest(TestCase):
+    def test_rebuild_reconciles_entries_in_place(self):
+        """rebuild не очищает ленты и досоздает записи одним запросом."""
+        User = get_user_model()
+        reader, author, other = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'author', 'other')
+        )
+        Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=reader, author=other)
+        kept, lost = (
+            Post.objects.create(author=author, text=text)
+            for text in ('kept', 'lost')
+        )
+        stale = Post.objects.create(author=other, text='stale')
+        kept_entry = TimelineEntry.objects.get(user=reader, post=kept)
+        TimelineEntry.objects.filter(post=lost).delete()
+        Follow.objects.bulk_create([Follow(user=other, author=author)])
+        Follow.objects.filter(author=other).delete()
+        TimelineEntry.objects.create(
+            user=reader, post=stale, author=other, pub_date=stale.pub_date
+        )
+        with CaptureQueriesContext(connection) as queries:
+            timeline.rebuild()
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user_id', 'post_id')),
+            {(reader.pk, kept.pk), (reader.pk, lost.pk),
+             (other.pk, kept.pk), (other.pk, lost.pk)}
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(pk=kept_entry.pk).exists()
+        )
+        inserts = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('INSERT')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn('SELECT', inserts[0])
+
+
+class TransferCommandsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        call_command(
+            'fill_database', users=10, groups=2, posts=30, follows=15,
+            comments=20, seed=2, stdout=StringIO()
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def snapshot(self):
+        return (
+            list(Group.objects.order_by('pk').values()),
+            list(Post.objects.order_by('pk').values()),
+            list(Comment.objects.order_by('pk').values()),
+            list(Follow.objects.order_by('pk').values()),
+        )
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка восстанавливают данные и счетчики."""
+        for data_format in ('jsonl', 'csv'):
+            with self.subTest(data_format=data_format):
+                expected = self.snapshot()
+                stats = list(UserStats.objects.order_by('pk').values())
+                call_command(
+                    'export_data', self.directory, format=data_format,
+                    chunk_size=7, stdout=StringIO()
+                )
+                Group.objects.all().delete()
+                Post.objects.all().delete()
+                Follow.objects.all().delete()
+                call_command(
+                    'import_data', self.directory, format=data_format,
+                    chunk_size=7, stdout=StringIO()
+                )
+                self.assertEqual(self.snapshot(), expected)
+                self.assertEqual(
+                    list(UserStats.objects.order_by('pk').values()), stats
+                )
+
+    def test_import_changes_validators(self):
+        """После загрузки старый ETag не дает 304, ленты видят посты."""
+        call_command(
+            'export_data', self.directory, tables=['posts'], stdout=StringIO()
+        )
+        Post.objects.all().delete()
+        cache.clear()
+        urls = (reverse('posts:feed'), reverse('api_v1:posts'))
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        call_command(
+            'import_data', self.directory, tables=['posts'], stdout=StringIO()
+        )
+        post = Post.objects.first()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etags[url])
+                self.assertIn(post.text, response.content.decode())
+
+    def test_import_resumes_from_checkpoint(self):
+        """--resume продолжает загрузку с позиции из checkpoint."""
+        call_command(
+            'export_data', self.directory, tables=['posts'], stdout=StringIO()
+        )
+        path = data_path(self.directory, 'posts', 'jsonl')
+        with open(path, encoding='utf-8') as source:
+            source.readline()
+            skipped_pk = json.loads(source.readline())['id']
+            write_checkpoint(path, offset=source.tell())
+        Post.objects.all().delete()
+        call_command(
+            'import_data', self.directory, tables=['posts'], resume=True,
+            skip_rebuild=True, stdout=StringIO()
+        )
+        self.assertEqual(Post.objects.count(), 28)
+        self.assertFalse(Post.objects.filter(pk=skipped_pk).exists())
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+
+class ParallelImportTest(TransactionTestCase):
+    # Потоки --workers пишут через свои соединения и не видят
+    # транзакцию TestCase. Тестовая БД SQLite в памяти не ждет
+    # busy_timeout при блокировке таблицы, поэтому сами записи
+    # выполняются по очереди.
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        call_command(
+            'fill_database', users=10, groups=2, posts=30, follows=15,
+            comments=20, seed=3, stdout=StringIO()
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_import_with_workers(self):
+        """--workers загружает все пачки и снимает checkpoint."""
+        expected = (
+            list(Post.objects.order_by('pk').values()),
+            list(Comment.objects.order_by('pk').values()),
+        )
+        call_command(
+            'export_data', self.directory, tables=['posts', 'comments'],
+            stdout=StringIO()
+        )
+        Post.objects.all().delete()
+        lock = threading.Lock()
+        threads = set()
+
+        def save_in_turn(*args, **kwargs):
+            with lock:
+                threads.add(threading.current_thread())
+                return save_chunk(*args, **kwargs)
+
+        with mock.patch('posts.bulk.save_chunk', side_effect=save_in_turn):
+            call_command(
+                'import_data', self.directory, tables=['posts', 'comments'],
+                chunk_size=4, workers=3, stdout=StringIO()
+            )
+        self.assertEqual(
+            (
+                list(Post.objects.order_by('pk').values()),
+                list(Comment.objects.order_by('pk').values()),
+            ),
+            expected
+        )
+        self.assertNotIn(threading.main_thread(), threads)
+        for table in ('posts', 'comments'):
+            path = data_path(self.directory, table, 'jsonl')
+            self.assertFalse(os.path.exists(f'{path}.checkpoint'))
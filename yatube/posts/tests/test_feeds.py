@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост в группе', author=cls.author, group=cls.group
+        )
+        cls.other_post = Post.objects.create(
+            text='Чужой пост', author=cls.other
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_content(self):
+        """Ленты группы и автора содержат только свои посты."""
+        cases = (
+            (reverse('posts:feed'), ('Пост в группе', 'Чужой пост'), ()),
+            (
+                reverse('posts:group_feed_atom', args=(self.group.slug,)),
+                ('Пост в группе',), ('Чужой пост',)
+            ),
+            (
+                reverse('posts:author_feed', args=(self.other.username,)),
+                ('Чужой пост',), ('Пост в группе',)
+            ),
+        )
+        for address, present, absent in cases:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertEqual(response.status_code, 200)
+                for text in present:
+                    self.assertContains(response, text)
+                for text in absent:
+                    self.assertNotContains(response, text)
+        response = self.client.get(
+            reverse('posts:group_feed', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_atom_feed_type(self):
+        response = self.client.get(reverse('posts:feed_atom'))
+        self.assertIn('application/atom+xml', response['Content-Type'])
+        self.assertContains(response, '<updated>')
+
+    def test_polling_gets_not_modified(self):
+        """Опрос без изменений — 304, после новой записи — 200."""
+        address = reverse('posts:author_feed', args=(self.author.username,))
+        etag = self.client.get(address)['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertLessEqual(len(context), 1)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый пост')
+
+    def test_projection_cached(self):
+        """Повторная лента строится без запроса постов."""
+        address = reverse('posts:feed')
+        self.client.get(address)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(address)
+        self.assertEqual(len(context), 0)
@@ -1,11 +1,16 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.defaultfilters import filesizeformat
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..models import Post, Group, Comment
 
@@ -144,6 +149,126 @@ class PostCreateFormTests(TestCase):
             'posts:post_detail', args=(my_post.pk,)
         ))
 
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_thumbnail_stored_on_post(self):
+        """Миниатюра строится заранее и сохраняется в посте."""
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'пост с картинкой',
+                'image': SimpleUploadedFile(
+                    name='thumb.gif',
+                    content=small_gif,
+                    content_type='image/gif'
+                ),
+            },
+        )
+        post = Post.objects.get(text='пост с картинкой')
+        self.assertTrue(post.thumbnail_url)
+        self.assertEqual(
+            (post.thumbnail_width, post.thumbnail_height), (960, 339)
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, post.thumbnail_url)
+
+    def test_pending_thumbnail_fallback_is_cropped(self):
+        """Пока миниатюры нет, оригинал обрезается под ее размер."""
+        with mock.patch('posts.signals.thumbnails.schedule'):
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': 'без миниатюры', 'image': self.upload_png(
+                    1200, 1200
+                )},
+            )
+        post = Post.objects.get(text='без миниатюры')
+        self.assertFalse(post.thumbnail_url)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(
+            response,
+            f'src="{post.image.url}" width="960" height="339" '
+            'style="object-fit: cover;"'
+        )
+
+    def upload_png(self, width, height):
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'white').save(buffer, 'PNG')
+        return SimpleUploadedFile(
+            name='big.png', content=buffer.getvalue(), content_type='image/png'
+        )
+
+    @override_settings(IMAGE_WORKERS=0, THUMBNAIL_WORKERS=0)
+    def test_oversized_image_downsampled(self):
+        """Слишком большая картинка уменьшается и пережимается в JPEG."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'большая картинка', 'image': self.upload_png(
+                settings.POST_IMAGE_MAX_DIMENSION * 2, 100
+            )},
+        )
+        post = Post.objects.get(text='большая картинка')
+        self.assertEqual(post.image.name, 'posts/big.jpg')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.width, settings.POST_IMAGE_MAX_DIMENSION)
+
+    @override_settings(
+        POST_IMAGE_MAX_BYTES=1024, FILE_UPLOAD_MAX_MEMORY_SIZE=0
+    )
+    def test_oversized_stream_reports_size(self):
+        """Обрезанный обработчиком поток дает ошибку о размере файла."""
+        buffer = BytesIO()
+        Image.frombytes('L', (128, 128), os.urandom(128 * 128)).save(
+            buffer, 'PNG'
+        )
+        self.assertGreater(len(buffer.getvalue()), 1024)
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'тяжелая картинка', 'image': SimpleUploadedFile(
+                name='noise.png', content=buffer.getvalue(),
+                content_type='image/png'
+            )},
+        )
+        self.assertFormError(
+            response, 'form', 'image',
+            f'Картинка больше {filesizeformat(1024)}.'
+        )
+        self.assertFalse(Post.objects.filter(text='тяжелая картинка').exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_pixel_limit_checked_before_decode(self):
+        """Картинка с большим числом пикселей отклоняется."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'много пикселей', 'image': self.upload_png(20, 20)},
+        )
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка слишком большая: 20x20 пикселей.'
+        )
+        self.assertFalse(Post.objects.filter(text='много пикселей').exists())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=10)
+    def test_byte_limit(self):
+        """Картинка тяжелее лимита отклоняется."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'тяжелая', 'image': self.upload_png(20, 20)},
+        )
+        self.assertFalse(response.context['form'].is_valid())
+        self.assertFalse(Post.objects.filter(text='тяжелая').exists())
+
     def test_edit_post_for_not_author(self):
         """Тестируем редактирование поста, не автором."""
         his_post = Post.objects.create(
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.timeline import held_author_ids
+
+User = get_user_model()
+
+LIST_TABLES = ('posts_post', 'posts_comment', 'posts_follow')
+SORT_STEP = 'USE TEMP B-TREE'
+
+
+def query_plan(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def scans(plan, ordered_index=None):
+    """Шаги плана, обходящие таблицу списка целиком.
+
+    Обход по ordered_index разрешен: так читается лента без фильтра,
+    страница берется из начала индекса и обрывается на LIMIT.
+    """
+    allowed = f'USING INDEX {ordered_index}' if ordered_index else None
+    return [
+        step for step in plan
+        if any(step.split(' ')[:2] == ['SCAN', table] for table in LIST_TABLES)
+        and not (allowed and step.endswith(allowed))
+    ]
+
+
+class ListQueryIndexesTest(TestCase):
+    """Запросы списков идут по индексам, без полного обхода и сортировки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(3)
+        ]
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for number in range(45):
+            post = Post.objects.create(
+                text=f'пост {number}',
+                author=cls.users[number % 3],
+                group=cls.group if number % 2 else None,
+            )
+            Comment.objects.create(
+                post=post, author=cls.users[0], text='комментарий'
+            )
+        Follow.objects.create(user=cls.users[0], author=cls.users[1])
+        Follow.objects.create(user=cls.users[2], author=cls.users[1])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.users[0])
+
+    def plans(self, url):
+        """Планы SELECT-запросов к таблицам списков, сделанных страницей.
+
+        COUNT(*) пропускается: это промах кеша счетчиков, а не запрос списка.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if sql.startswith('SELECT COUNT(*)') or not any(
+                f'FROM "{table}"' in sql for table in LIST_TABLES
+            ):
+                continue
+            yield sql, query_plan(sql)
+
+    def assertIndexed(self, url, ordered_index=None, allow_sort=False):
+        for sql, plan in self.plans(url):
+            with self.subTest(url=url, sql=sql[:80]):
+                self.assertEqual(scans(plan, ordered_index), [], plan)
+                if not allow_sort:
+                    self.assertNotIn(SORT_STEP, ' '.join(plan), plan)
+
+    def test_list_views_read_in_index_order(self):
+        post = Post.objects.filter(author=self.users[1]).first()
+        for url in (
+            reverse('posts:main_page'),
+            reverse('posts:main_page') + '?page=2',
+        ):
+            self.assertIndexed(url, ordered_index='post_pub_date_id_idx')
+        urls = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:group_list', args=(self.group.slug,)) + '?page=2',
+            reverse('posts:profile', args=(self.users[1].username,)),
+            reverse('posts:post_detail', args=(post.pk,)),
+        )
+        for url in urls:
+            self.assertIndexed(url)
+        cursor_page = self.client.get(
+            reverse('posts:profile', args=(self.users[1].username,))
+            + '?cursor='
+        ).context['page_obj']
+        self.assertIsNotNone(cursor_page.next_cursor)
+        self.assertIndexed(
+            reverse('posts:profile', args=(self.users[1].username,))
+            + f'?cursor={cursor_page.next_cursor}'
+        )
+
+    def test_follow_index_uses_timeline_index(self):
+        """Лента читается по индексу (user, -pub_date, -post) без сортировки.
+
+        Список авторов с неразосланными постами кешируется и строится
+        по частичному индексу, поэтому здесь он заранее прогрет.
+        """
+        held_author_ids()
+        address = reverse('posts:follow_index')
+        first_page = self.client.get(address + '?cursor=').context['page_obj']
+        next_url = address + f'?cursor={first_page.next_cursor}'
+        second_page = self.client.get(next_url).context['page_obj']
+        self.assertEqual(
+            list(first_page) + list(second_page),
+            list(Post.objects.filter(author=self.users[1])[:20])
+        )
+        for url in (
+            address,
+            address + '?page=2',
+            next_url,
+            address + f'?cursor={second_page.previous_cursor}',
+        ):
+            self.assertIndexed(url)
+
+    def test_followers_lookup_uses_index(self):
+        """Рассылка поста ищет подписчиков по индексу (author, user)."""
+        queryset = Follow.objects.filter(
+            author=self.users[1]
+        ).values_list('user_id', flat=True)
+        sql, params = queryset.query.sql_with_params()
+        plan = query_plan(sql, params)
+        self.assertIn('follow_author_user_idx', ' '.join(plan))
@@ -1,8 +1,12 @@
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -30,3 +34,95 @@ class PostModelTest(TestCase):
         """Проверяем работоспособность модели Group."""
         group = PostModelTest.group
         self.assertEqual(group.title, 'Тестовая группа')
+
+    def test_edit_bumps_version(self):
+        """Сохранение поста увеличивает version и сдвигает updated_at."""
+        post = Post.objects.get(pk=PostModelTest.post.pk)
+        self.assertEqual(post.version, 1)
+        updated_at = post.updated_at
+        post.text = 'Исправленный пост'
+        post.save()
+        post.group = PostModelTest.group
+        post.save(update_fields=['group'])
+        post.refresh_from_db()
+        self.assertEqual(post.version, 3)
+        self.assertGreater(post.updated_at, updated_at)
+        Post.objects.filter(pk=post.pk).update(**Post.edit_marks())
+        post.refresh_from_db()
+        self.assertEqual(post.version, 4)
+
+    def test_concurrent_edit_keeps_version(self):
+        """Параллельный update не теряет увеличение version при save."""
+        post = Post.objects.get(pk=PostModelTest.post.pk)
+        Post.objects.filter(pk=post.pk).update(**Post.edit_marks())
+        post.text = 'Правка поверх миниатюры'
+        post.save()
+        self.assertEqual(post.version, 3)
+        post.refresh_from_db()
+        self.assertEqual(post.version, 3)
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(
+            text='пост', author=self.author, group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author.stats.refresh_from_db()
+        self.reader.stats.refresh_from_db()
+        self.group.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        post.group = None
+        post.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        post.delete()
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 0)
+
+    def test_reassigned_post_moves_author_counter(self):
+        post = Post.objects.create(text='пост', author=self.author)
+        post.author = self.reader
+        post.save()
+        self.author.stats.refresh_from_db()
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 0)
+        self.assertEqual(self.reader.stats.posts_count, 1)
+
+    def test_failed_counter_update_rolls_back_save(self):
+        """Пост и его счетчики сохраняются в одной транзакции."""
+        with mock.patch(
+            'posts.signals.counters.increment', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                Post.objects.create(text='пост', author=self.author)
+        self.assertFalse(Post.objects.exists())
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        Post.objects.bulk_create(
+            Post(text=f'{i}', author=self.author, group=self.group)
+            for i in range(3)
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 3
+        )
+        self.assertTrue(UserStats.objects.filter(user=self.reader).exists())
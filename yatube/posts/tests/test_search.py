@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import get_backend
+from posts.stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Словоформы приводятся к одной основе."""
+        forms = (
+            ('котами', 'кот'),
+            ('котов', 'кот'),
+            ('красивая', 'красив'),
+            ('красивыми', 'красив'),
+            ('гуляли', 'гуля'),
+            ('гуляющий', 'гуля'),
+        )
+        for word, expected in forms:
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.cats = Post.objects.create(
+            text='Коты гуляли по крыше', author=cls.user
+        )
+        cls.dogs = Post.objects.create(
+            text='Собака лает, кот кота не слышит', author=cls.user
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query):
+        return list(get_backend().search(query)[:10])
+
+    def test_russian_word_forms_found(self):
+        """Поиск находит посты по другим формам слова."""
+        self.assertEqual(self.found('котов'), [self.dogs, self.cats])
+        self.assertEqual(self.found('гулять'), [self.cats])
+        self.assertEqual(self.found('крыша коты'), [self.cats])
+        self.assertEqual(self.found('слон'), [])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.cats.pk)
+        post.text = 'Слоны гуляли по крыше'
+        post.save()
+        self.assertEqual(self.found('слон'), [self.cats])
+        self.assertEqual(self.found('котов'), [self.dogs])
+        Post.objects.filter(pk=self.dogs.pk).delete()
+        self.assertEqual(self.found('котов'), [])
+
+    def test_rebuild_restores_index(self):
+        """rebuild_search_index переиндексирует посты без сигналов."""
+        Post.objects.bulk_create([Post(text='кошки', author=self.user)])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.found('кошка')), 1)
+
+    def test_search_view_paginates_results(self):
+        """Страница поиска показывает выдачу постранично."""
+        Post.objects.bulk_create(
+            [Post(text=f'кот номер {number}', author=self.user)
+             for number in range(12)]
+        )
+        get_backend().rebuild()
+        response = self.client.get(reverse('posts:search'), {'q': 'коты'})
+        self.assertTemplateUsed(response, 'posts/search.html')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 14)
+        self.assertEqual(len(page_obj), 10)
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'коты', 'page': 2}
+        )
+        self.assertEqual(len(response.context['page_obj']), 4)
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('posts:search'), {'q': '  '})
+        self.assertIsNone(response.context['page_obj'])
+
+    @override_settings(SEARCH_BACKEND='posts.search.LikeSearchBackend')
+    def test_like_backend(self):
+        """Запасной бэкенд ищет подстроку."""
+        self.assertEqual(self.found('крыше'), [self.cats])
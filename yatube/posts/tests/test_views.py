@@ -1,3 +1,5 @@
+from datetime import timedelta
+from io import StringIO
 from random import randint
 import shutil
 import tempfile
@@ -6,10 +8,16 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from posts.models import Post, Group, Follow
+from posts.models import Comment, Post, Group, Follow, TimelineEntry
+from posts import freshness
+from posts.cards import card_key
 from posts.forms import PostForm
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -200,6 +208,7 @@ class PaginatorViewsTest(TestCase):
                 1, randint(settings.LIMITED + 2, settings.LIMITED * 2)
             )
         )
+        call_command('reconcile_counters', stdout=StringIO())
         self.addresses = [
             reverse('posts:main_page'),
             reverse('posts:group_list', args=(
@@ -227,6 +236,72 @@ class PaginatorViewsTest(TestCase):
                     ), len(self.posts) - settings.LIMITED
                 )
 
+    def test_page_links_windowed(self):
+        """Число ссылок пагинатора не растет с числом страниц."""
+        Group.objects.filter(pk=self.group.pk).update(posts_count=10 ** 6)
+        address = reverse('posts:group_list', args=(self.group.slug,))
+        response = self.client.get(address, {'page': 2})
+        pages = response.context['page_obj'].paginator.num_pages
+        self.assertContains(response, f'?page={pages}"')
+        self.assertContains(response, '?page=4"')
+        self.assertNotContains(response, '?page=5"')
+        self.assertContains(response, '&hellip;', count=1)
+
+
+class CursorPaginatorViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Текстовый заголовок',
+            slug='test-slug',
+            description='текстовый текст')
+        Post.objects.bulk_create(
+            Post(text=f'{i}', author=self.user, group=self.group)
+            for i in range(settings.LIMITED * 2 + 3)
+        )
+        self.addresses = [
+            reverse('posts:main_page'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        ]
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        """Курсоры проходят ленту без пропусков и повторов."""
+        expected = list(Post.objects.values_list('pk', flat=True))
+        for address in self.addresses:
+            with self.subTest(address=address):
+                response = self.client.get(address, {'cursor': ''})
+                page_obj = response.context['page_obj']
+                self.assertFalse(page_obj.has_previous())
+                seen = [post.pk for post in page_obj]
+                while page_obj.has_next():
+                    response = self.client.get(
+                        address, {'cursor': page_obj.next_cursor}
+                    )
+                    page_obj = response.context['page_obj']
+                    seen += [post.pk for post in page_obj]
+                self.assertEqual(seen, expected)
+                response = self.client.get(
+                    address, {'cursor': page_obj.previous_cursor}
+                )
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    expected[settings.LIMITED:settings.LIMITED * 2]
+                )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор отдает первую страницу."""
+        response = self.client.get(
+            reverse('posts:main_page'), {'cursor': 'не-курсор'}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            list(Post.objects.values_list('pk', flat=True)[
+                :settings.LIMITED
+            ])
+        )
+
 
 class CachePagesTest(TestCase):
     def setUp(self):
@@ -258,10 +333,85 @@ class CachePagesTest(TestCase):
         response2 = self.authorized_client.get(reverse('posts:main_page'))
         self.assertNotEqual(response2.content, response.content)
 
+    def test_main_page_cached_once_for_everyone(self):
+        """Кеш главной общий, шапка рисуется для каждого пользователя."""
+        address = reverse('posts:main_page')
+        anonymous = self.client.get(address)
+        self.assertNotContains(anonymous, 'Пользователь:')
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.get(address)
+        self.assertFalse(any(
+            'posts_post' in query['sql'] for query in context.captured_queries
+        ))
+        self.assertContains(response, 'Пользователь:')
+        self.assertContains(response, 'Избранные авторы')
+        self.assertNotContains(response, '<!--hole:')
+        self.assertContains(response, self.post.text)
+
+    def test_post_card_invalidated_on_edit(self):
+        """Карточка поста пересобирается после редактирования."""
+        address = reverse('posts:group_list', args=(self.group.slug,))
+        self.post.group = self.group
+        self.post.save()
+        self.assertIsNone(cache.get(card_key(self.post)))
+        self.client.get(address)
+        self.assertIn('Новый пост', cache.get(card_key(self.post)))
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = self.client.get(address)
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_post_card_invalidated_on_author_rename(self):
+        """Карточка показывает новое имя автора сразу после правки."""
+        address = reverse('posts:group_list', args=(self.group.slug,))
+        self.post.group = self.group
+        self.post.save()
+        self.client.get(address)
+        author = User.objects.get(pk=self.post.author_id)
+        author.first_name, author.last_name = 'Новое', 'Имя'
+        author.save()
+        self.assertContains(self.client.get(address), 'Новое Имя')
+
+
+class PostDetailCommentsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(text='Пост', author=self.user)
+        self.address = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def add_comments(self, amount):
+        start = Comment.objects.count()
+        for i in range(start, start + amount):
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create_user(username=f'reader{i}'),
+                text=f'Комментарий {i}',
+            )
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.address)
+        return response, len(context)
+
+    def test_detail_queries_do_not_grow_with_comments(self):
+        """Число запросов post_detail не зависит от числа комментариев."""
+        self.add_comments(1)
+        _, queries_with_one = self.count_queries()
+        self.add_comments(settings.COMMENTS_LIMITED)
+        response, queries_with_many = self.count_queries()
+        self.assertEqual(queries_with_one, queries_with_many)
+        self.assertEqual(
+            len(response.context['comments']), settings.COMMENTS_LIMITED
+        )
+        response = self.client.get(self.address, {'comments_page': 2})
+        self.assertEqual(len(response.context['comments']), 1)
+
 
 class FollowTest(TestCase):
     """Тестируем подписчиков."""
     def setUp(self):
+        cache.clear()
         self.author = User.objects.create_user(username='auth')
         self.user = User.objects.create_user(username='not_auth')
         self.not_follower = User.objects.create_user(
@@ -333,3 +483,144 @@ class FollowTest(TestCase):
             reverse('posts:profile_follow', args=(self.user.username,)))
         get_follow = Follow.objects.filter(user=self.user, author=self.user)
         self.assertEqual(get_follow.count(), follow_count)
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Новый пост автора попадает в ленту подписчика."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='свежий пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_hot_author_posts_read_without_fan_out(self):
+        """Посты популярного автора подмешиваются в ленту при чтении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        cache.clear()
+        post = Post.objects.create(text='пост для всех', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [post, self.post]
+        )
+
+    def test_hot_posts_kept_after_author_cools_down(self):
+        """Посты, написанные популярным автором, не пропадают из ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.settings(TIMELINE_FANOUT_LIMIT=0):
+            cache.clear()
+            hot_post = Post.objects.create(text='горячий', author=self.author)
+        cache.clear()
+        cold_post = Post.objects.create(text='обычный', author=self.author)
+        self.assertFalse(hot_post.fanned_out)
+        self.assertTrue(cold_post.fanned_out)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [cold_post, hot_post, self.post]
+        )
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            text='Пост', author=self.user, group=self.group
+        )
+        self.addresses = (
+            reverse('posts:main_page'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+
+    def test_not_modified(self):
+        """Повторный запрос с ETag получает 304 без выборки постов."""
+        for address in self.addresses:
+            with self.subTest(address=address):
+                etag = self.client.get(address)['ETag']
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(
+                        address, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertLessEqual(len(context), 1)
+
+    def test_validators_change_after_edit(self):
+        """Правка поста меняет ETag всех страниц, где он виден."""
+        etags = [self.client.get(address)['ETag']
+                 for address in self.addresses]
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        for address, etag in zip(self.addresses, etags):
+            with self.subTest(address=address):
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_changes_post_page(self):
+        address = self.addresses[-1]
+        etag = self.client.get(address)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_comment_keeps_list_pages(self):
+        """Комментарий не сдвигает валидаторы лент, группы и профиля."""
+        etags = [self.client.get(address)['ETag']
+                 for address in self.addresses[:3]]
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        for address, etag in zip(self.addresses, etags):
+            with self.subTest(address=address):
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_last_modified_only_for_anonymous(self):
+        """Last-Modified отдается анонимам, ETag различается по юзерам."""
+        address = self.addresses[2]
+        anonymous = self.client.get(address)
+        self.assertIn('Last-Modified', anonymous)
+        response = self.client.get(
+            address, HTTP_IF_MODIFIED_SINCE=anonymous['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+        client = Client()
+        client.force_login(self.user)
+        authorized = client.get(address)
+        self.assertNotIn('Last-Modified', authorized)
+        self.assertNotEqual(authorized['ETag'], anonymous['ETag'])
+
+    def test_cached_main_page_keeps_its_etag(self):
+        """ETag главной из кеша относится к отрисованной версии."""
+        address = self.addresses[0]
+        cached = self.client.get(address)
+        Post.objects.create(text='Свежий пост', author=self.user)
+        response = self.client.get(address)
+        self.assertEqual(response.content, cached.content)
+        self.assertEqual(response['ETag'], cached['ETag'])
+        cache.clear()
+        response = self.client.get(address)
+        self.assertContains(response, 'Свежий пост')
+        self.assertNotEqual(response['ETag'], cached['ETag'])
+
+    @override_settings(DATABASE_REPLICAS=['default'], REPLICA_PIN_SECONDS=60)
+    def test_no_validators_while_replicas_lag(self):
+        """Пока изменение могло не дойти до реплик, валидаторов нет."""
+        address = self.addresses[1]
+        response = self.client.get(address)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        stamp = timezone.now() - timedelta(seconds=61)
+        scopes = (freshness.EPOCH, freshness.group_scope(self.group.pk))
+        freshness.stamps().set_many(
+            {freshness.KEY.format(scope): stamp for scope in scopes}, None
+        )
+        self.assertIn('ETag', self.client.get(address))
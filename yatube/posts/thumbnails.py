@@ -0,0 +1,79 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+Миниатюра строится в пуле потоков после коммита сохранения поста,
+ее адрес и размеры записываются в Post, поэтому шаблоны не обращаются
+к Pillow и хранилищу sorl при отрисовке. THUMBNAIL_WORKERS = 0
+включает синхронную генерацию (удобно в тестах).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import get_thumbnail
+
+from .freshness import touch_post
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def generate(post_id):
+    """Строит миниатюру и сохраняет ее адрес и размеры в посте."""
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'image', 'author_id', 'group_id'
+    ).first()
+    if post is None or not post.image:
+        return
+    thumbnail = get_thumbnail(
+        post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+    )
+    if not thumbnail.exists():
+        logger.warning('Не удалось построить миниатюру поста %s', post_id)
+        return
+    Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail_url=thumbnail.url,
+        thumbnail_width=thumbnail.width,
+        thumbnail_height=thumbnail.height,
+        **Post.edit_marks(),
+    )
+    touch_post(post)
+
+
+def _generate_safely(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Ошибка генерации миниатюры поста %s', post_id)
+
+
+def _generate_in_worker(post_id):
+    try:
+        _generate_safely(post_id)
+    finally:
+        connection.close()
+
+
+def schedule(post_id):
+    """Ставит генерацию миниатюры в очередь после коммита транзакции."""
+    if not settings.THUMBNAIL_WORKERS:
+        _generate_safely(post_id)
+        return
+    transaction.on_commit(
+        lambda: executor().submit(_generate_in_worker, post_id)
+    )
@@ -0,0 +1,175 @@
+"""Лента подписок с рассылкой при записи (fan-out-on-write).
+
+Посты обычных авторов раскладываются в TimelineEntry подписчиков
+в момент публикации. Посты авторов, у которых подписчиков больше
+TIMELINE_FANOUT_LIMIT, не рассылаются, а подмешиваются при чтении.
+Решение записывается в Post.fanned_out и не меняется, когда автор
+потом теряет или набирает подписчиков, поэтому ни один пост не
+выпадает из ленты.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .utils import keyset
+
+HOT_AUTHORS_KEY = 'timeline_hot_authors'
+HELD_AUTHORS_KEY = 'timeline_held_authors'
+# Ключ курсора разосланной ленты: копия pub_date и id поста в записи.
+TIMELINE_KEY = ('timeline_entries__pub_date', 'timeline_entries__post_id')
+
+
+def hot_author_ids():
+    """Авторы, чьи новые посты не рассылаются по лентам."""
+    author_ids = cache.get(HOT_AUTHORS_KEY)
+    if author_ids is None:
+        author_ids = set(
+            UserStats.objects.filter(
+                followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+            ).values_list('user_id', flat=True)
+        )
+        cache.set(HOT_AUTHORS_KEY, author_ids, settings.CACHE_TIME)
+    return author_ids
+
+
+def held_author_ids():
+    """Авторы, у которых есть неразосланные посты."""
+    author_ids = cache.get(HELD_AUTHORS_KEY)
+    if author_ids is None:
+        author_ids = set(
+            Post.objects.filter(fanned_out=False)
+            .order_by().values_list('author_id', flat=True).distinct()
+        )
+        cache.set(HELD_AUTHORS_KEY, author_ids, settings.CACHE_TIME)
+    return author_ids
+
+
+def decide_fan_out(post):
+    """Отмечает новый пост популярного автора как неразосланный."""
+    held = held_author_ids()
+    post.fanned_out = post.author_id not in hot_author_ids()
+    if not post.fanned_out and post.author_id not in held:
+        cache.delete(HELD_AUTHORS_KEY)
+
+
+def entries(user_ids, posts):
+    return (
+        TimelineEntry(
+            user_id=user_id, post_id=post_id, author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in user_ids
+        for post_id, author_id, pub_date in posts
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if not post.fanned_out:
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        entries(
+            followers.iterator(),
+            [(post.pk, post.author_id, post.pub_date)]
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту разосланными постами автора после подписки."""
+    posts = Post.objects.filter(
+        author_id=author_id, fanned_out=True
+    ).values_list('pk', 'author_id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        entries([user_id], posts.iterator()),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def timeline_posts(user, **cursor):
+    """Посты ленты подписок пользователя от ключа курсора (utils.keyset).
+
+    Без неразосланных постов и фильтр ключа, и сортировка идут по
+    полям записей ленты: страница читается по индексу
+    (user, -pub_date, -post) без сортировки на любом курсоре.
+    """
+    posts = Post.objects.select_related('author', 'group')
+    held_followed = list(
+        Follow.objects.filter(
+            user=user, author_id__in=held_author_ids()
+        ).values_list('author_id', flat=True)
+    )
+    if not held_followed:
+        return keyset(
+            posts, key=TIMELINE_KEY, timeline_entries__user=user, **cursor
+        )
+    return keyset(
+        posts.filter(
+            Q(pk__in=TimelineEntry.objects.filter(
+                user=user
+            ).values('post_id'))
+            | Q(author_id__in=held_followed, fanned_out=False)
+        ),
+        **cursor
+    )
+
+
+def insert_entries(follows):
+    """INSERT ... SELECT записей ленты из подписок и постов их авторов."""
+    ops = connection.ops
+    sql, params = follows.values_list(
+        'user_id', 'author__posts__id', 'author_id', 'author__posts__pub_date'
+    ).order_by().query.sql_with_params()
+    columns = ', '.join(
+        ops.quote_name(column)
+        for column in ('user_id', 'post_id', 'author_id', 'pub_date')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '{} {} ({}) {} {}'.format(
+                ops.insert_statement(ignore_conflicts=True),
+                ops.quote_name(TimelineEntry._meta.db_table),
+                columns, sql,
+                ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+            ),
+            params
+        )
+
+
+def rebuild():
+    """Сверяет ленты с текущими подписками (после массовой загрузки).
+
+    Рассылка постов решается заново по текущему числу подписчиков.
+    Удаляются только лишние записи, недостающие досоздаются одним
+    INSERT ... SELECT; таблица не очищается, и ленты читаются
+    целиком до конца транзакции.
+    """
+    hot = hot_author_ids()
+    with transaction.atomic():
+        Post.objects.filter(fanned_out=False).exclude(
+            author_id__in=hot
+        ).update(fanned_out=True)
+        Post.objects.filter(
+            fanned_out=True, author_id__in=hot
+        ).update(fanned_out=False)
+        TimelineEntry.objects.filter(post__fanned_out=False).delete()
+        TimelineEntry.objects.annotate(followed=Exists(
+            Follow.objects.filter(
+                user_id=OuterRef('user_id'), author_id=OuterRef('author_id')
+            )
+        )).filter(followed=False).delete()
+        insert_entries(Follow.objects.filter(author__posts__fanned_out=True))
+    cache.delete(HELD_AUTHORS_KEY)
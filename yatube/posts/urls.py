@@ -1,19 +1,34 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='main_page'),
+    path('feed/', feeds.latest_rss, name='feed'),
+    path('feed/atom/', feeds.latest_atom, name='feed_atom'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/feed/', feeds.group_rss, name='group_feed'),
+    path(
+        'group/<slug:slug>/feed/atom/', feeds.group_atom,
+        name='group_feed_atom'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/feed/', feeds.author_rss, name='author_feed'
+    ),
+    path(
+        'profile/<str:username>/feed/atom/', feeds.author_atom,
+        name='author_feed_atom'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
+    path('search/', views.search, name='search'),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
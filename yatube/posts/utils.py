@@ -1,7 +1,200 @@
-from django.core.paginator import Paginator
+from django.core.paginator import Page, Paginator
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+POST_KEY = ('pub_date', 'pk')
 
-def paginator(request, post_object, limit):
-    paginator = Paginator(post_object, limit)
+
+def encode_cursor(post, direction=CURSOR_NEXT):
+    """Упаковывает ключ (pub_date, id) поста в непрозрачный курсор."""
+    if post is None:
+        return encode_key(None, None, direction)
+    return encode_key(post.pub_date, post.pk, direction)
+
+
+def encode_key(pub_date, pk, direction=CURSOR_NEXT):
+    if pub_date is None:
+        payload = f'{direction}||'
+    else:
+        payload = f'{direction}|{pub_date.isoformat()}|{pk}'
+    return urlsafe_base64_encode(payload.encode())
+
+
+def decode_cursor(cursor):
+    """Возвращает (direction, pub_date, pk) или None для битого курсора."""
+    try:
+        direction, pub_date, pk = force_str(
+            urlsafe_base64_decode(cursor)
+        ).split('|')
+    except (TypeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+        return None
+    if not pub_date and not pk:
+        return direction, None, None
+    try:
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except ValueError:
+        return None
+    if pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+def keyset(queryset, pub_date=None, pk=None, descending=True,
+           key=POST_KEY, **filters):
+    """Посты после ключа (pub_date, pk) в порядке ключа.
+
+    key — поля, по которым идут фильтр и сортировка. filters попадают
+    в тот же filter(): условия на многозначную связь (записи ленты)
+    должны использовать один JOIN с ключом, иначе индекс не работает.
+    """
+    date_field, id_field = key
+    lookup = 'lt' if descending else 'gt'
+    after = Q()
+    if pub_date is not None:
+        after = Q(**{f'{date_field}__{lookup}': pub_date}) | Q(**{
+            date_field: pub_date, f'{id_field}__{lookup}': pk
+        })
+    return queryset.filter(after, **filters).order_by(*(
+        F(field).desc() if descending else F(field).asc() for field in key
+    ))
+
+
+class CursorPage(Page):
+    """Страница keyset-пагинации: без номера и без общего количества."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self.object_list)} objects>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(self.object_list[-1], CURSOR_NEXT)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor(self.object_list[0], CURSOR_PREVIOUS)
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id) вместо LIMIT/OFFSET.
+
+    Стоимость любой страницы одинакова: запрос идет по индексу
+    pub_date от ключа из курсора и не считает COUNT(*). Вместо
+    queryset можно передать функцию с аргументами keyset (без
+    queryset), если ключ лежит не в полях поста.
+    """
+
+    def _keyset(self, **cursor):
+        if callable(self.object_list):
+            return self.object_list(**cursor)
+        return keyset(self.object_list, **cursor)
+
+    def get_cursor_page(self, cursor):
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return self._page_after(None, None, has_previous=False)
+        direction, pub_date, pk = decoded
+        if direction == CURSOR_PREVIOUS:
+            return self._page_before(pub_date, pk)
+        return self._page_after(pub_date, pk, has_previous=True)
+
+    def _page_after(self, pub_date, pk, has_previous):
+        queryset = self._keyset(pub_date=pub_date, pk=pk)
+        posts = list(queryset[:self.per_page + 1])
+        return CursorPage(
+            posts[:self.per_page],
+            self,
+            has_next=len(posts) > self.per_page,
+            has_previous=has_previous,
+        )
+
+    def _page_before(self, pub_date, pk):
+        queryset = self._keyset(pub_date=pub_date, pk=pk, descending=False)
+        posts = list(queryset[:self.per_page + 1])
+        return CursorPage(
+            posts[:self.per_page][::-1],
+            self,
+            has_next=pub_date is not None,
+            has_previous=len(posts) > self.per_page,
+        )
+
+
+PAGES_ON_EACH_SIDE = 2
+PAGES_ON_ENDS = 1
+
+
+def page_window(number, num_pages, on_each_side=PAGES_ON_EACH_SIDE,
+                on_ends=PAGES_ON_ENDS):
+    """Номера страниц вокруг текущей и по краям, None на месте пропуска.
+
+    Длина не зависит от числа страниц: не больше
+    2 * (on_each_side + on_ends) + 3 элементов.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    window = []
+    if number > on_each_side + on_ends + 2:
+        window.extend(range(1, on_ends + 1))
+        window.append(None)
+        window.extend(range(number - on_each_side, number))
+    else:
+        window.extend(range(1, number))
+    window.append(number)
+    if number < num_pages - on_each_side - on_ends - 1:
+        window.extend(range(number + 1, number + on_each_side + 1))
+        window.append(None)
+        window.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window.extend(range(number + 1, num_pages + 1))
+    return window
+
+
+class CountedPaginator(Paginator):
+    """Paginator с заранее известным количеством объектов."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+def paginator(request, post_object, limit, count=None):
+    """Страница по курсору или по номеру.
+
+    post_object — queryset или функция с аргументами keyset (например,
+    timeline_posts): без аргументов она дает весь список по порядку.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor is not None:
+        return CursorPaginator(post_object, limit).get_cursor_page(cursor)
+    if callable(post_object):
+        post_object = post_object()
+    if count is None:
+        paginator = Paginator(post_object, limit)
+    else:
+        if callable(count):
+            count = count()
+        paginator = CountedPaginator(post_object, limit, count)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
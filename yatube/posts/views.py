@@ -1,28 +1,47 @@
+from functools import partial
+
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
-from django.views.decorators.cache import cache_page
+from django.core.paginator import Paginator
+
+from core.db import pin_primary, replica_reads
+from core.page_cache import cache_page_shared
 
+from . import freshness
+from .counters import posts_total, timeline_total, user_stats
 from .forms import PostForm, CommentForm
-from .models import Follow, Post, Group, Comment, User
-from .utils import paginator
+from .models import Follow, Post, Group, User
+from .search import get_backend
+from .timeline import timeline_posts
+from .utils import CountedPaginator, paginator
 
 
-@cache_page(settings.CACHE_TIME, key_prefix='main_page')
+@freshness.conditional(freshness.index_scopes)
+@cache_page_shared(settings.CACHE_TIME, key_prefix='main_page')
+@freshness.remember_stamp
+@replica_reads
 def index(request):
     post_list = Post.objects.select_related('author', 'group')
-    page_obj = paginator(request, post_list, settings.LIMITED)
+    page_obj = paginator(
+        request, post_list, settings.LIMITED, count=posts_total
+    )
     context = {
         'page_obj': page_obj,
-        'index': True
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@freshness.conditional(freshness.group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = freshness.page_object(request) or get_object_or_404(
+        Group, slug=slug
+    )
     posts = group.posts.select_related('author', 'group')
-    page_obj = paginator(request, posts, settings.LIMITED)
+    page_obj = paginator(
+        request, posts, settings.LIMITED, count=group.posts_count
+    )
     context = {
         'group': group,
         'page_obj': page_obj
@@ -30,10 +49,16 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@freshness.conditional(freshness.profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = freshness.page_object(request) or get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     posts = author.posts.select_related('author', 'group')
-    page_obj = paginator(request, posts, settings.LIMITED)
+    page_obj = paginator(
+        request, posts, settings.LIMITED, count=user_stats(author).posts_count
+    )
     following = (
         request.user.is_authenticated
         and author != request.user
@@ -49,10 +74,18 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@freshness.conditional(freshness.post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = freshness.page_object(request) or get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     form = CommentForm()
-    comments = Comment.objects.select_related('post').filter(post=post)
+    comments = CountedPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_LIMITED,
+        post.comments_count,
+    ).get_page(request.GET.get('comments_page'))
     context = {
         'post': post,
         'form': form,
@@ -61,7 +94,22 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = Paginator(
+            get_backend().search(query), settings.LIMITED
+        ).get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@pin_primary
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -76,6 +124,7 @@ def post_create(request):
 
 
 @login_required
+@pin_primary
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
@@ -98,6 +147,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@pin_primary
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     comment_form = CommentForm(request.POST or None)
@@ -110,17 +160,20 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(request, post_list, settings.LIMITED)
+    page_obj = paginator(
+        request, partial(timeline_posts, request.user), settings.LIMITED,
+        count=partial(timeline_total, request.user)
+    )
     context = {
         'page_obj': page_obj,
-        'follow': True
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@pin_primary
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -129,6 +182,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@pin_primary
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user is not author:
@@ -1,5 +1,6 @@
 import os
 import mimetypes
+import tempfile
 
 mimetypes.add_type("application/javascript", ".js", True)
 
@@ -22,9 +23,31 @@ ALLOWED_HOSTS = [
 ]
 
 LIMITED = 10
+COMMENTS_LIMITED = 50
 POST_LIMITER = 50
 TEST_LIMITER = 15
 CACHE_TIME = 20
+# core.stale_cache: сколько отдавать устаревшее значение во время
+# пересчета, срок блокировки пересчета и коэффициент раннего пересчета.
+CACHE_STALE_TIME = 60 * 5
+CACHE_LOCK_TIMEOUT = 10
+CACHE_EARLY_BETA = 1.0
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 1000
+COUNTERS_CACHE_TIME = 60 * 60
+POST_CARD_VERSION = 1
+POST_CARD_CACHE_TIME = 60 * 60 * 24
+ETAG_VERSION = 1
+API_CACHE_TIME = 60 * 60
+API_MAX_LIMIT = 100
+FEED_SIZE = 20
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 1))
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_MAX_DIMENSION = 1920
+POST_IMAGE_REENCODE_BYTES = 512 * 1024
+POST_IMAGE_QUALITY = 85
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -42,6 +65,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +85,46 @@ INTERNAL_IPS = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Метрики запросов (core.middleware.PerformanceMiddleware).
+SERVER_TIMING = os.getenv('SERVER_TIMING', '1') != '0'
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 0.5))
+SLOW_REQUEST_SAMPLE_RATE = float(os.getenv('SLOW_REQUEST_SAMPLE_RATE', 1))
+# За обратным прокси на этой же машине все запросы приходят с 127.0.0.1,
+# поэтому там /metrics/ закрывается токеном: с METRICS_TOKEN сборщик
+# передает заголовок Authorization: Bearer <токен>, а адреса не проверяются.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Выборочное профилирование (core.profiling), включается на /profiling/.
+PROFILE_DIR = os.getenv(
+    'PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'yatube_profiles')
+)
+PROFILE_DUMP_SECONDS = int(os.getenv('PROFILE_DUMP_SECONDS', 60))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.getenv(
+                'SLOW_REQUEST_LOG',
+                os.path.join(tempfile.gettempdir(), 'yatube_slow_requests.log')
+            ),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'encoding': 'utf-8',
+        },
+    },
+    'loggers': {
+        'yatube.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -84,21 +149,135 @@ TEMPLATES = [
     },
 ]
 
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+SHARED_CACHES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'yatube_cache')
+        ),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+}
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'OPTIONS': {
+            'LOCAL': 'local',
+            'SHARED': 'shared',
+            'LOCAL_TIMEOUT': int(os.getenv('CACHE_LOCAL_TIMEOUT', 5)),
+        },
+    },
+    'local': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'LOCATION': 'local',
+    },
+    'shared': SHARED_CACHES[CACHE_BACKEND],
 }
 
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'posts.uploads.SizeLimitedUploadHandler',
+]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+
+def postgresql_database(host):
+    """Настройки PostgreSQL из переменных окружения."""
+    pool_size = int(os.getenv('DB_POOL_SIZE', 0))
+    database = {
+        'ENGINE': (
+            'core.backends.postgresql_pool' if pool_size
+            else 'django.db.backends.postgresql'
+        ),
+        'NAME': os.getenv('POSTGRES_DB', 'yatube'),
+        'USER': os.getenv('POSTGRES_USER', 'yatube'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': host,
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(
+            os.getenv('DB_CONN_MAX_AGE', 0 if pool_size else 60)
+        ),
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            'options': '-c statement_timeout={}'.format(
+                os.getenv('DB_STATEMENT_TIMEOUT', 5000)
+            ),
+        },
     }
-}
+    if pool_size:
+        database['POOL'] = {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': pool_size,
+        }
+    return database
+
+
+# Реплики перечисляются через запятую: хосты PostgreSQL или файлы SQLite.
+DB_REPLICAS = [
+    replica for replica in os.getenv('DATABASE_REPLICAS', '').split(',')
+    if replica
+]
+
+
+def databases(engine, replicas):
+    """DATABASES: default и реплики replica_<n>, в тестах зеркалящие default."""
+    if engine == 'postgresql':
+        result = {
+            'default': postgresql_database(os.getenv('DB_HOST', 'localhost')),
+        }
+        replica_databases = [postgresql_database(host) for host in replicas]
+    else:
+        result = {
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            }
+        }
+        replica_databases = [
+            {'ENGINE': 'django.db.backends.sqlite3', 'NAME': replica}
+            for replica in replicas
+        ]
+    for number, replica in enumerate(replica_databases, start=1):
+        result[f'replica_{number}'] = dict(
+            replica, TEST={'MIRROR': 'default'}
+        )
+    return result
+
+
+DATABASES = databases(DB_ENGINE, DB_REPLICAS)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# PRAGMA для каждого соединения SQLite; SQLITE_TUNING=0 — настройки SQLite
+# по умолчанию (rollback journal), например для сравнения в benchmark.
+# Режим журнала хранится в самом файле БД, поэтому задается один раз
+# после migrate, а не при каждом соединении.
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', '1') != '0'
+SQLITE_JOURNAL_MODE = 'wal' if SQLITE_TUNING else 'delete'
+SQLITE_PRAGMAS = {
+    'synchronous': 'normal',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'cache_size': -int(os.getenv('SQLITE_CACHE_KB', 64 * 1024)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_BYTES', 256 * 1024 * 1024)),
+    'temp_store': 'memory',
+} if SQLITE_TUNING else {}
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10
 
 
 AUTH_PASSWORD_VALIDATORS = [